@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+
+from planner_core import Occurrence, format_date
+
+# Deadlines at most this many minutes apart count as clashing (0: the same time slot only)
+CLASH_WINDOW = 0
+
+# How far back recurring tasks are checked for missed occurrences
+OVERDUE_LOOKBACK_DAYS = 30
+
+# Calendar heat of a day: its open tasks weighted by priority
+LOAD_WEIGHTS = (3, 2, 1)    # High, Medium, Low
+
+PRIORITIES = ("High", "Medium", "Low")
+
+
+class Clash:
+    """Open tasks whose deadlines fall within CLASH_WINDOW minutes of each other."""
+
+    def __init__(self, tasks):
+        self.tasks = tasks      # (deadline, task), in deadline order
+
+    @property
+    def start(self):
+        return self.tasks[0][0]
+
+    @property
+    def end(self):
+        return self.tasks[-1][0]
+
+    def counts(self):
+        # Number of tasks per priority, strongest first, leaving out priorities with none.
+        # Priorities outside PRIORITIES are counted together as "other", last.
+        counts = {}
+        for _, task in self.tasks:
+            priority = task.priority if task.priority in PRIORITIES else "other"
+            counts[priority] = counts.get(priority, 0) + 1
+        return [(priority, counts[priority]) for priority in PRIORITIES + ("other",) if priority in counts]
+
+    def describe(self):
+        # e.g. "3 High tasks at 16:00" or "3 tasks at 16:00-16:30 (2 High, 1 Low)"
+        when = f"{self.start:%H:%M}" if self.start == self.end else f"{self.start:%H:%M}-{self.end:%H:%M}"
+        counts = self.counts()
+        if len(counts) == 1 and counts[0][0] != "other":
+            return f"{len(self.tasks)} {counts[0][0]} tasks at {when}"
+        details = ", ".join(f"{count} {priority}" for priority, count in counts)
+        return f"{len(self.tasks)} tasks at {when} ({details})"
+
+
+def deadlines(store, first, last):
+    # (deadline, task) of the open tasks and occurrences due within [first, last] that
+    # have a time, in deadline order. Walks the date index, so only that range is read.
+    timed = [(task.deadline, task) for task in store.between(first, last, open_only=True) if task.deadline]
+    timed.sort(key=lambda item: item[0])
+    return timed
+
+
+def clashes(store, first, last, window=CLASH_WINDOW):
+    # Sweep the deadlines in order; a deadline within `window` minutes of the previous one
+    # joins its group. Groups of two or more are clashes.
+    found, group = [], []
+    gap = timedelta(minutes=window)
+    for deadline, task in deadlines(store, first, last):
+        if group and deadline - group[-1][0] > gap:
+            if len(group) > 1:
+                found.append(Clash(group))
+            group = []
+        group.append((deadline, task))
+    if len(group) > 1:
+        found.append(Clash(group))
+    return found
+
+
+def daily_load(store, first, last):
+    # {date: (High, Medium, Low, done)} for the days within [first, last] that have tasks,
+    # from the store's per-month summaries (only months changed since are recounted)
+    load = {}
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        for day, summary in store.month_summary(year, month).items():
+            if first <= day <= last:
+                load[day] = summary[3] + (summary[2],)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return load
+
+
+def weekly_load(store, first, last):
+    # {Monday: (High, Medium, Low, done)} summed from daily_load
+    weeks = {}
+    for day, counts in daily_load(store, first, last).items():
+        monday = day - timedelta(days=day.weekday())
+        total = weeks.get(monday, (0, 0, 0, 0))
+        weeks[monday] = tuple(a + b for a, b in zip(total, counts))
+    return weeks
+
+
+def day_heat(summary):
+    # Open tasks of a day summary (see planner_core.day_summary) weighted by priority
+    return sum(weight * count for weight, count in zip(LOAD_WEIGHTS, summary[3]))
+
+
+def overdue(store, now=None, lookback_days=OVERDUE_LOOKBACK_DAYS):
+    # Open tasks whose deadline (or day, without a time) has passed, oldest first. A recurring
+    # task counts once, as its oldest open occurrence from the last `lookback_days` days.
+    now = now or datetime.now()
+    today = now.date()
+    dates = store.dates()
+    late = []
+    if dates and dates[0] <= today:
+        # Dated tasks: every bucket up to today, without expanding recurring series over all of it
+        for task in store.between(dates[0], today, open_only=True, recurring=False):
+            if task.date < today or (task.deadline and task.deadline < now):
+                late.append(task)
+    missed = set()
+    for task in store.between(today - timedelta(days=lookback_days), today, open_only=True):
+        if not isinstance(task, Occurrence) or task.source in missed:
+            continue
+        if task.date < today or (task.deadline and task.deadline < now):
+            missed.add(task.source)
+            late.append(task)
+    # By deadline; tasks without a time go last on their day
+    late.sort(key=lambda task: (task.date, task.deadline or datetime.combine(task.date, datetime.max.time())))
+    return late
+
+
+def analytics_messages(store, now=None):
+    # Extra lines for the daily summary notification: clashing deadlines today and
+    # tomorrow, and how many tasks are overdue
+    now = now or datetime.now()
+    today = now.date()
+    messages = []
+    for day, name in ((today, "today"), (today + timedelta(days=1), "tomorrow")):
+        for clash in clashes(store, day, day):
+            if clash.end >= now:
+                messages.append(f"{clash.describe()} {name}")
+    late = overdue(store, now)
+    if late:
+        messages.append(f"{len(late)} open task(s) overdue, the oldest from {format_date(late[0].date)}")
+    return messages
@@ -0,0 +1,122 @@
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timedelta
+
+from planner_core import INDEX_MIN_TASKS, Task, TaskStore
+
+# Completed tasks older than this many days leave the live task file
+ARCHIVE_AFTER_DAYS = 30
+
+ARCHIVE_DIR = 'archive'
+
+MONTH_FILE = re.compile(r"^(\d{4})-(\d{2})\.jsonl\.gz$")
+
+
+class Archive:
+    """Completed tasks moved out of the live task file, in one file per month of their date.
+
+    Files are append-only: each archiving run adds a gzip member of JSON lines (one task
+    text each) to the months it touches, and gzip reads the members back as one stream.
+    Months are read only when asked for. The first search reads every month into one
+    store, kept for later searches; an archive of INDEX_MIN_TASKS or more tasks gets
+    that store's trigram index then, as the live store does.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.directory = directory
+        self._months = {}       # (year, month) -> archived tasks, once read
+        self._store = None      # every archived task, for search; built on demand
+
+    def path(self, year, month):
+        return os.path.join(self.directory, f"{year:04d}-{month:02d}.jsonl.gz")
+
+    def months(self):
+        # (year, month) of every archive file, oldest first
+        if not os.path.isdir(self.directory):
+            return []
+        found = (MONTH_FILE.match(name) for name in os.listdir(self.directory))
+        return sorted((int(match.group(1)), int(match.group(2))) for match in found if match)
+
+    def has_month(self, year, month):
+        return (year, month) in self._months or os.path.exists(self.path(year, month))
+
+    def month(self, year, month):
+        tasks = self._months.get((year, month))
+        if tasks is None:
+            tasks = self._months[(year, month)] = [Task.parse(text) for text in self.read(year, month)]
+        return tasks
+
+    def read(self, year, month):
+        path = self.path(year, month)
+        if not os.path.exists(path):
+            return []
+        texts = []
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    texts.append(json.loads(line))
+        except (EOFError, ValueError, OSError) as e:
+            # A crash mid-append leaves a truncated last member; what was read before it stands
+            print(f"Error reading archive {path}: {e}")
+        return texts
+
+    def add(self, tasks):
+        # Append tasks to their months. Tasks already there (by id) are skipped, so
+        # re-running an interrupted archiving doesn't duplicate them.
+        by_month = {}
+        for task in tasks:
+            by_month.setdefault((task.date.year, task.date.month), []).append(task)
+
+        os.makedirs(self.directory, exist_ok=True)
+        for (year, month), group in sorted(by_month.items()):
+            archived = self.month(year, month)
+            known = {task.id for task in archived}
+            new = [task for task in group if task.id not in known]
+            if not new:
+                continue
+            with gzip.open(self.path(year, month), 'at', encoding='utf-8') as f:
+                for task in new:
+                    # Formatted afresh so the id it had while live is stored with it
+                    f.write(json.dumps(task.format()) + "\n")
+            archived.extend(new)
+            if self._store is not None:
+                self._store.extend(new)
+
+    def store(self):
+        if self._store is None:
+            self._store = TaskStore(task for year, month in self.months()
+                                    for task in self.month(year, month))
+            if len(self._store) >= INDEX_MIN_TASKS:
+                self._store.text_index.build()
+        return self._store
+
+    def search(self, query):
+        return self.store().search(query)
+
+    def get(self, task_id):
+        # Only tasks that have been searched for or shown can be asked for
+        return self._store.get(task_id) if self._store is not None else None
+
+
+def archive_directory(path):
+    # The archive kept next to a task file: tasks.json -> archive/, work.json -> work.archive/
+    folder, name = os.path.split(path)
+    stem = os.path.splitext(name)[0]
+    return os.path.join(folder, ARCHIVE_DIR if stem == 'tasks' else f"{stem}.{ARCHIVE_DIR}")
+
+
+def archive_completed(store, archive, older_than_days=ARCHIVE_AFTER_DAYS, today=None):
+    # Move completed tasks dated more than `older_than_days` ago from `store` to `archive`.
+    # They are written to the archive before being removed, so a crash loses nothing.
+    # Recurring series stay live. Returns the tasks moved.
+    today = today or datetime.now().date()
+    cutoff = today - timedelta(days=older_than_days)
+    old = [task for task in store
+           if task.status == "Done" and task.recurrence is None and task.date and task.date < cutoff]
+    if old:
+        archive.add(old)
+        for task in old:
+            store.remove(task)
+    return old
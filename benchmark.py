@@ -0,0 +1,340 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from analytics import analytics_messages, clashes, overdue, weekly_load
+from interchange import import_tasks, read_csv, read_ics, write_csv, write_ics
+from planner_core import DEFAULT_SORT, INDEX_MIN_TASKS, SortOrder, Task, TaskStore
+from storage import JournalStorage
+
+# Generated tasks are spread over two years from BASE_DATE; "today" for the
+# upcoming-tasks benchmark is the middle of that range
+BASE_DATE = date(2025, 1, 1)
+SPAN_DAYS = 730
+TODAY = BASE_DATE + timedelta(days=SPAN_DAYS // 2)
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# Tasks added (and then edited) one at a time by the insert benchmark
+INSERTS = 100
+
+# Searches typed into the search box: free text, field filters and both together
+QUERIES = ("review", "rev", "priority:High", "status:Done", "date:>=01/06/25",
+           "report priority:Low", "xyzzy")
+
+WORDS = ("review", "report", "call", "meeting", "invoice", "design", "release", "plan",
+         "budget", "client", "team", "draft", "update", "backup", "dentist", "groceries")
+PRIORITIES = ("High", "Medium", "Low")
+REPEATS = ("FREQ=DAILY", "FREQ=WEEKLY;BYDAY=MO,WE,FR", "FREQ=MONTHLY", "FREQ=YEARLY")
+
+
+def generate_tasks(count, seed=0):
+    # Task texts with a realistic mix: all priorities, about a quarter completed (as [Done]
+    # or with a ✓), both date formats, optional times and reminders, and a few recurring tasks
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        day = BASE_DATE + timedelta(days=rng.randrange(SPAN_DAYS))
+        date_str = day.strftime("%d/%m/%Y" if rng.random() < 0.3 else "%d/%m/%y")
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).capitalize()
+        description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 8)))
+        label = rng.choices(PRIORITIES, weights=(2, 5, 3))[0]
+        done = rng.random()
+        if done < 0.15:
+            label = "Done"
+        text = f"{date_str} - {title} [{label}]: {description}"
+        if rng.random() < 0.8:
+            text += f" ({rng.randrange(24):02d}:{rng.choice((0, 15, 30, 45)):02d})"
+            if rng.random() < 0.2:
+                text += f" {{remind {rng.choice((5, 15, 30, 60))}m}}"
+        if rng.random() < 0.01:
+            text += f" {{rrule {rng.choice(REPEATS)}}}"
+        if 0.15 <= done < 0.25:
+            text += " ✓"
+        texts.append(text)
+    return texts
+
+
+def write_tasks_file(path, count, seed=0):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(generate_tasks(count, seed), f)
+
+
+# Each benchmark is (setup, operation): setup(path) returns the argument for operation and is
+# not timed. They exercise the same planner_core calls as the GUI handlers named in the comments,
+# without Tk; the calendar and list widgets themselves are not part of the measurement.
+
+def setup_load(path):
+    return path
+
+
+def run_load(path):
+    # load_tasks: read the file, parse every task and index it
+    storage = JournalStorage(path)
+    try:
+        return TaskStore(Task.parse(text) for text in storage.load())
+    finally:
+        storage.close()
+
+
+def setup_store(path):
+    storage = JournalStorage(path)
+    try:
+        texts = storage.load()
+    finally:
+        storage.close()
+    random.Random(1).shuffle(texts)
+    return TaskStore(Task.parse(text) for text in texts)
+
+
+def run_sort(store):
+    # sort_tasks
+    store.sort(SortOrder(DEFAULT_SORT))
+
+
+def setup_sorted_store(path):
+    store = setup_store(path)
+    store.sort(SortOrder(DEFAULT_SORT))
+    return store, [Task.parse(text) for text in generate_tasks(INSERTS, seed=2)]
+
+
+def run_insert(argument):
+    # add_task / edit_task: single tasks placed into a sorted store
+    store, tasks = argument
+    for task in tasks:
+        store.add(task)
+    for task in tasks:
+        store.update(task, priority="High")
+
+
+def setup_indexed_store(path):
+    # As the GUI has it after loading: stores of INDEX_MIN_TASKS or more are indexed
+    store = setup_store(path)
+    if len(store) >= INDEX_MIN_TASKS:
+        store.text_index.build()
+    return store
+
+
+def run_index(store):
+    # The search index, built a chunk at a time while the GUI loads a large file
+    store.text_index.build()
+
+
+def run_filter(store):
+    # filter_tasks, as the search box does it: each query typed one character at a time
+    for query in QUERIES:
+        for end in range(1, len(query) + 1):
+            store.search(query[:end])
+        store.search("")
+
+
+def run_highlight(store):
+    # highlight_tasks after paging the calendar: the month on display and its neighbours
+    for offset in (-1, 0, 1):
+        index = TODAY.year * 12 + TODAY.month - 1 + offset
+        store.month_summary(index // 12, index % 12 + 1)
+
+
+def run_upcoming(store):
+    # get_upcoming_tasks
+    store.upcoming(7, TODAY)
+
+
+def run_analytics(store):
+    # check_notifications' clash and overdue lines, then `stats`: clashes over two weeks,
+    # load per week over the whole range and every overdue task
+    now = datetime(TODAY.year, TODAY.month, TODAY.day, 12)
+    analytics_messages(store, now)
+    clashes(store, TODAY, TODAY + timedelta(days=14))
+    weekly_load(store, BASE_DATE, BASE_DATE + timedelta(days=SPAN_DAYS))
+    overdue(store, now)
+
+
+def run_export_ics(store):
+    # export --format ics, written nowhere
+    for _ in write_ics(store):
+        pass
+
+
+def run_export_csv(store):
+    for _ in write_csv(store):
+        pass
+
+
+def setup_import(path, extension, write):
+    # The generated tasks exported in a format (once per size), and a fresh task file to import into
+    source = f"{os.path.splitext(path)[0]}.{extension}"
+    if not os.path.exists(source):
+        with open(source, 'w', encoding='utf-8', newline='') as f:
+            for chunk in write(setup_store(path)):
+                f.write(chunk)
+    return source, os.path.join(tempfile.mkdtemp(dir=os.path.dirname(path)), 'tasks.json')
+
+
+def setup_import_ics(path):
+    return setup_import(path, 'ics', write_ics)
+
+
+def setup_import_csv(path):
+    return setup_import(path, 'csv', write_csv)
+
+
+def run_import(argument, read):
+    # import: the file streamed through the reader into storage in batches
+    source, target = argument
+    storage = JournalStorage(target)
+    try:
+        with open(source, 'r', encoding='utf-8', newline='') as f:
+            import_tasks(storage, (task.text for task in read(f, [])), set())
+    finally:
+        storage.close()
+
+
+def run_import_ics(argument):
+    run_import(argument, read_ics)
+
+
+def run_import_csv(argument):
+    run_import(argument, read_csv)
+
+
+BENCHMARKS = {
+    "load": (setup_load, run_load),
+    "sort": (setup_store, run_sort),
+    "insert": (setup_sorted_store, run_insert),
+    "index": (setup_store, run_index),
+    "filter": (setup_indexed_store, run_filter),
+    "highlight": (setup_store, run_highlight),
+    "upcoming": (setup_store, run_upcoming),
+    "analytics": (setup_store, run_analytics),
+    "export_ics": (setup_store, run_export_ics),
+    "import_ics": (setup_import_ics, run_import_ics),
+    "export_csv": (setup_store, run_export_csv),
+    "import_csv": (setup_import_csv, run_import_csv),
+}
+
+
+def measure(setup, operation, path, repeat):
+    # Median wall time over `repeat` runs, then one more run under tracemalloc for peak memory
+    # (tracing slows Python down, so it's kept out of the timed runs)
+    times = []
+    for _ in range(repeat):
+        argument = setup(path)
+        start = time.perf_counter()
+        operation(argument)
+        times.append(time.perf_counter() - start)
+
+    argument = setup(path)
+    tracemalloc.start()
+    try:
+        operation(argument)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": statistics.median(times), "min_seconds": min(times), "peak_kb": peak // 1024}
+
+
+def run_benchmarks(sizes, names, repeat, seed=0):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f"tasks_{size}.json")
+            write_tasks_file(path, size, seed)
+            results[str(size)] = {}
+            for name in names:
+                setup, operation = BENCHMARKS[name]
+                result = measure(setup, operation, path, repeat)
+                results[str(size)][name] = result
+                print(f"{size:>7} {name:<10} {result['seconds'] * 1000:10.2f} ms "
+                      f"{result['peak_kb']:>10} KiB peak")
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold, min_delta=0.001):
+    # Lines describing operations that got slower than `threshold` times the baseline.
+    # Differences under `min_delta` seconds are timer noise and never count.
+    regressions = []
+    for size, operations in report["results"].items():
+        for name, result in operations.items():
+            previous = baseline.get("results", {}).get(size, {}).get(name)
+            if not previous or not previous["seconds"]:
+                continue
+            ratio = result["seconds"] / previous["seconds"]
+            if ratio > threshold and result["seconds"] - previous["seconds"] >= min_delta:
+                regressions.append(f"{name} at {size} tasks: {previous['seconds'] * 1000:.2f} ms -> "
+                                   f"{result['seconds'] * 1000:.2f} ms ({ratio:.2f}x)")
+    return regressions
+
+
+def command_run(args):
+    names = args.only or list(BENCHMARKS)
+    report = run_benchmarks(args.sizes, names, args.repeat, args.seed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta / 1000)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+def command_generate(args):
+    write_tasks_file(args.file, args.count, args.seed)
+    print(f"Wrote {args.count} tasks to {args.file}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the planner's task operations.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="time load, sort, insert, index, filter, highlight, upcoming, analytics and ICS/CSV import and export")
+    run.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    run.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="benchmarks to run (default: all)")
+    run.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark (default: 5)")
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--output', default='benchmark_results.json')
+    run.add_argument('--compare', metavar='BASELINE', help="earlier results file to check against")
+    run.add_argument('--threshold', type=float, default=1.25,
+                     help="slowdown ratio reported as a regression (default: 1.25)")
+    run.add_argument('--min-delta', type=float, default=1.0,
+                     help="ignore slowdowns smaller than this many ms (default: 1)")
+    run.set_defaults(handler=command_run)
+
+    generate = commands.add_parser('generate', help="write a synthetic tasks.json")
+    generate.add_argument('count', type=int)
+    generate.add_argument('file')
+    generate.add_argument('--seed', type=int, default=0)
+    generate.set_defaults(handler=command_generate)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+from collections import deque
+from contextlib import contextmanager
+
+from planner_core import Task
+
+# Task text kept for undo and redo, in KiB; the oldest steps are dropped beyond it
+HISTORY_LIMIT_KB = 1024
+
+
+class History:
+    """Undo/redo log of the changes a TaskStore makes, bounded by the size of the text it keeps.
+
+    Sits between the store and its storage like SyncedStorage: every add, remove and
+    update is passed on to the storage (so it's journaled as before) and recorded as an
+    (old text, new text) pair, None standing for "no task". Undoing a pair is applying
+    it the other way round, so only the changed tasks' texts are kept, never the task
+    list. Each change is one step; steps sit in a ring buffer and the oldest roll off
+    once their text exceeds `limit_kb`.
+    """
+
+    def __init__(self, storage, limit_kb=HISTORY_LIMIT_KB):
+        self.storage = storage
+        self.limit = limit_kb * 1024
+        self.undo_steps = deque()   # oldest first
+        self.redo_steps = []        # most recently undone last
+        self.size = 0               # bytes of text in both
+        self.paused = False
+
+    def add(self, text):
+        self.storage.add(text)
+        self.record([(None, text)])
+
+    def remove(self, text):
+        self.storage.remove(text)
+        self.record([(text, None)])
+
+    def update(self, old_text, new_text):
+        self.storage.update(old_text, new_text)
+        self.record([(old_text, new_text)])
+
+    def add_many(self, texts):
+        # A bulk insert is undone as a whole
+        texts = list(texts)
+        self.storage.add_many(texts)
+        self.record([(None, text) for text in texts])
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+    @contextmanager
+    def pausing(self):
+        # Changes made meanwhile (e.g. received from the sync server) aren't undoable
+        self.paused = True
+        try:
+            yield
+        finally:
+            self.paused = False
+
+    def record(self, step):
+        if self.paused:
+            return
+        # A new change makes the undone steps unreachable
+        self.size -= sum(map(step_size, self.redo_steps))
+        self.redo_steps.clear()
+        self.undo_steps.append(step)
+        self.size += step_size(step)
+        while self.size > self.limit and self.undo_steps:
+            self.size -= step_size(self.undo_steps.popleft())
+
+    def can_undo(self):
+        return bool(self.undo_steps)
+
+    def can_redo(self):
+        return bool(self.redo_steps)
+
+    def undo(self, store, count=1):
+        # Undo the last `count` steps in one go; returns the (old, new) tasks changed, as
+        # SyncClient.poll does
+        steps = [self.undo_steps.pop() for _ in range(min(count, len(self.undo_steps)))]
+        self.redo_steps.extend(steps)
+        pairs = [(new, old) for step in steps for old, new in reversed(step)]
+        return self.replay(store, pairs)
+
+    def redo(self, store, count=1):
+        steps = [self.redo_steps.pop() for _ in range(min(count, len(self.redo_steps)))]
+        self.undo_steps.extend(steps)
+        return self.replay(store, [pair for step in steps for pair in step])
+
+    def replay(self, store, pairs):
+        # Apply (old text, new text) pairs to the store without recording them again. A task
+        # that has since gone (e.g. deleted by someone else) is skipped.
+        changes = []
+        with self.pausing():
+            for old_text, new_text in pairs:
+                task = find(store, old_text) if old_text is not None else None
+                if old_text is not None and task is None:
+                    continue
+                if new_text is None:
+                    store.remove(task)
+                    changes.append((task, None))
+                elif task is None:
+                    new = Task.parse(new_text)
+                    store.add(new)
+                    changes.append((None, new))
+                else:
+                    # Edited in place, so anything holding the task keeps seeing it
+                    old = Task.parse(task.text)
+                    store.restore(task, new_text)
+                    changes.append((old, task))
+        return changes
+
+
+def step_size(step):
+    return sum(len(text) for pair in step for text in pair if text)
+
+
+def find(store, text):
+    # The task a recorded text is of: by its id, or for a task saved before ids by its text
+    task = store.get(Task.parse(text).id)
+    if task is not None:
+        return task
+    return next((task for task in store if task.text == text), None)
@@ -0,0 +1,180 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Samples kept per metric; older ones roll off so a long session doesn't grow without bound
+WINDOW = 1000
+
+# Heartbeat period for measuring event-loop lag (ms)
+HEARTBEAT_MS = 100
+
+DEFAULT_DUMP_PATH = 'planner_profile.json'
+
+
+class Histogram:
+    """Rolling window of samples (seconds) plus lifetime count and total."""
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+        self.worst = max(self.worst, value)
+
+    def stats(self):
+        # Percentiles are over the rolling window; count, mean and max over the whole session
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000 if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": self.worst * 1000,
+        }
+
+
+class Profiler:
+    """Opt-in timing of handlers, Tk callbacks and storage writes, plus event counters.
+
+    When disabled every instrument_* call is a no-op and wrap() returns the function
+    itself, so an uninstrumented session pays nothing.
+    """
+
+    def __init__(self, enabled=False, dump_path=DEFAULT_DUMP_PATH):
+        self.enabled = enabled
+        self.dump_path = dump_path
+        self.histograms = {}
+        self.counters = {}
+        # Storage writes are timed on the writer thread
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls, argv=()):
+        # PLANNER_PROFILE=1 (or a dump file path), or --profile on the command line
+        value = os.environ.get('PLANNER_PROFILE', '')
+        enabled = '--profile' in argv or value not in ('', '0')
+        dump_path = value if value not in ('', '0', '1') else DEFAULT_DUMP_PATH
+        return cls(enabled, dump_path)
+
+    def record(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def wrap(self, name, func):
+        if not self.enabled:
+            return func
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return timed
+
+    def instrument_methods(self, obj, prefix, names):
+        # Replace bound methods on `obj` with timed ones; do this before they're passed to widgets
+        if not self.enabled:
+            return
+        for name in names:
+            setattr(obj, name, self.wrap(f"{prefix}.{name}", getattr(obj, name)))
+
+    def instrument_tk(self, root):
+        # Time every callback scheduled through root.after / root.after_idle, by callback name
+        if not self.enabled:
+            return
+        after, after_idle = root.after, root.after_idle
+
+        def callback_name(func):
+            return f"after.{getattr(func, '__name__', type(func).__name__)}"
+
+        def timed_after(ms, func=None, *args):
+            if func is None:
+                return after(ms)
+            return after(ms, self.wrap(callback_name(func), func), *args)
+
+        def timed_after_idle(func, *args):
+            return after_idle(self.wrap(callback_name(func), func), *args)
+
+        root.after, root.after_idle = timed_after, timed_after_idle
+        self.start_heartbeat(root, after)
+
+    def start_heartbeat(self, root, after):
+        # A timer that should fire every HEARTBEAT_MS; how late it actually fires is the time
+        # the event loop spent busy. Uses the unwrapped `after` so it isn't timed itself.
+        expected = [time.perf_counter() + HEARTBEAT_MS / 1000]
+
+        def beat():
+            now = time.perf_counter()
+            self.record("loop.lag", max(0.0, now - expected[0]))
+            expected[0] = now + HEARTBEAT_MS / 1000
+            after(HEARTBEAT_MS, beat)
+        after(HEARTBEAT_MS, beat)
+
+    def instrument_storage(self, storage):
+        if not self.enabled:
+            return
+        self.instrument_methods(storage, "storage", ("write_batch", "compact"))
+
+    def instrument_calendar(self, calendar):
+        # Count calendar events created and removed
+        if not self.enabled:
+            return
+        create, remove = calendar.calevent_create, calendar.calevent_remove
+
+        def counted_create(*args, **kwargs):
+            self.count("calendar.events_created")
+            return create(*args, **kwargs)
+
+        def counted_remove(*args, **kwargs):
+            self.count("calendar.events_removed")
+            return remove(*args, **kwargs)
+
+        calendar.calevent_create, calendar.calevent_remove = counted_create, counted_remove
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "timings": {name: histogram.stats() for name, histogram in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def report(self):
+        # Plain-text table of the snapshot, for the debug window and the console
+        data = self.snapshot()
+        lines = [f"{'metric':<32}{'count':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"]
+        for name, stats in data["timings"].items():
+            lines.append(f"{name:<32}{stats['count']:>8}{stats['mean_ms']:>9.2f}{stats['p50_ms']:>9.2f}"
+                         f"{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['max_ms']:>9.2f}")
+        for name, value in data["counters"].items():
+            lines.append(f"{name:<32}{value:>8}")
+        return "\n".join(lines)
+
+    def dump(self, path=None):
+        path = path or self.dump_path
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
@@ -0,0 +1,352 @@
+import csv
+import hashlib
+import io
+import re
+from datetime import date, datetime, timezone
+
+from planner_core import (ID_SUFFIX, TASK_PATTERN, Recurrence, Task, format_date, legacy_task_id, parse_task_date,
+                          parse_time)
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    ZoneInfo = None
+
+# Tasks handed to storage per add_many call; each is one journal write or one transaction
+IMPORT_BATCH = 1000
+
+# UIDs of exported tasks; importing them back keeps the task's id
+UID_DOMAIN = 'python-planner'
+OWN_UID = re.compile(r"^([0-9a-f]{12})@" + re.escape(UID_DOMAIN) + "$")
+
+CSV_FIELDS = ("date", "time", "title", "priority", "status", "description", "reminder", "repeat", "id")
+
+# iCalendar PRIORITY is 1 (highest) to 9, 0 meaning undefined
+ICS_PRIORITY = {"High": 1, "Medium": 5, "Low": 9}
+
+ICS_DURATION = re.compile(r"^-P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+# Unsupported by Recurrence but harmless to drop
+IGNORED_RRULE_PARTS = ("WKST",)
+
+
+def uid_task_id(uid):
+    # Task id for an imported event: its own id if we exported it, otherwise derived from the UID
+    match = OWN_UID.match(uid)
+    if match:
+        return match.group(1)
+    return hashlib.sha1(uid.encode('utf-8')).hexdigest()[:12]
+
+
+def content_key(text):
+    # Identifies a task by everything but its id, so the same task imported twice is caught
+    return legacy_task_id(ID_SUFFIX.sub("", text))
+
+
+# --- iCalendar ---
+
+def unfold(lines):
+    # RFC 5545 content lines: a line starting with a space or tab continues the previous one
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def parse_property(line):
+    # "NAME;PARAM=x;PARAM=y:value" -> (NAME, {PARAM: x}, value)
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    return name.upper(), dict(param.partition("=")[::2] for param in params), value
+
+
+def unescape(value):
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def escape(value):
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def plain_title(value):
+    # A title as part of one line of task text: square brackets would end it early (the
+    # first " [x]: " is read as the priority), so they become parentheses
+    return " ".join(value.replace("[", "(").replace("]", ")").split())
+
+
+def plain_description(value):
+    # A description as part of one line of task text. Braces, a trailing "(HH:MM)" and a
+    # trailing "✓" would be read back as the reminder, recurrence, id, time or done mark.
+    value = " ".join(value.replace("{", "(").replace("}", ")").split())
+    value = re.sub(r"\((\d{1,2}:\d{2})\)$", r"\1", value)
+    return re.sub(r" ✓$", " (✓)", value)
+
+
+def parse_ics_datetime(value, params):
+    # (date, "HH:MM" or None) in local time
+    # Sliced rather than strptime'd, which dominated the import time
+    day = date(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return day, None
+    if value[8:9] != "T":
+        raise ValueError(value)
+    moment = datetime(day.year, day.month, day.day, int(value[9:11]), int(value[11:13]))
+    if value.endswith("Z"):
+        moment = moment.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    elif "TZID" in params and ZoneInfo is not None:
+        try:
+            zone = ZoneInfo(params["TZID"].strip('"'))
+        except (KeyError, ValueError):
+            # Unknown zone: the wall-clock time is the best guess
+            zone = None
+        if zone is not None:
+            moment = moment.replace(tzinfo=zone).astimezone().replace(tzinfo=None)
+    return moment.date(), moment.strftime("%H:%M")
+
+
+def ics_rrule(value):
+    # An iCalendar RRULE in the form Recurrence reads: date-only UNTIL, no WKST
+    parts = []
+    for part in value.split(";"):
+        key, _, rule_value = part.partition("=")
+        if key.upper() in IGNORED_RRULE_PARTS:
+            continue
+        if key.upper() == "UNTIL":
+            rule_value = rule_value[:8]
+        parts.append(f"{key}={rule_value}")
+    return ";".join(parts)
+
+
+def read_ics(lines, errors, source='-'):
+    # Yield a Task for each VEVENT or VTODO, reading `lines` (any iterable of text lines)
+    # as it goes. Cancelled events are left out.
+    component, alarm, number = None, False, 0
+    for number, line in enumerate(unfold(lines), 1):
+        if not line:
+            continue
+        name, params, value = parse_property(line)
+        if name == "BEGIN" and value.upper() in ("VEVENT", "VTODO"):
+            component = {"kind": value.upper(), "line": number}
+        elif component is None:
+            continue
+        elif name == "BEGIN" and value.upper() == "VALARM":
+            alarm = True
+        elif name == "END" and value.upper() == "VALARM":
+            alarm = False
+        elif alarm:
+            if name == "TRIGGER" and "reminder" not in component:
+                match = ICS_DURATION.match(value)
+                if match:
+                    weeks, days, hours, minutes, _ = (int(part or 0) for part in match.groups())
+                    component["reminder"] = ((weeks * 7 + days) * 24 + hours) * 60 + minutes or None
+        elif name == "END" and value.upper() in ("VEVENT", "VTODO"):
+            task = ics_task(component, errors, source)
+            if task is not None:
+                yield task
+            component = None
+        elif name in ("DTSTART", "DUE") and name not in component:
+            component[name] = (value, params)
+        else:
+            component.setdefault(name, value)
+
+
+def ics_task(component, errors, source):
+    where = f"{source}:{component['line']}"
+    start = component.get("DTSTART") or component.get("DUE")
+    if start is None:
+        errors.append(f"{where}: {component['kind']} without a date")
+        return None
+    status = component.get("STATUS", "").upper()
+    if status == "CANCELLED":
+        return None
+    try:
+        day, time = parse_ics_datetime(*start)
+    except ValueError:
+        errors.append(f"{where}: unreadable date {start[0]!r}")
+        return None
+
+    try:
+        priority = int(component.get("PRIORITY", "0") or 0)
+    except ValueError:
+        errors.append(f"{where}: invalid priority {component['PRIORITY']!r}; imported as Medium")
+        priority = 0
+    label = "High" if 1 <= priority <= 4 else "Low" if priority >= 6 else "Medium"
+    done = status == "COMPLETED" or component.get("X-PLANNER-STATUS", "").upper() == "DONE"
+    recurrence = None
+    if "RRULE" in component:
+        try:
+            recurrence = Recurrence(ics_rrule(component["RRULE"]))
+        except ValueError as e:
+            errors.append(f"{where}: {e}; imported as a single event")
+    done_dates = frozenset(filter(None, (parse_task_date(value) for value in
+                                         component.get("X-PLANNER-DONE", "").split(","))))
+    uid = component.get("UID")
+    title = plain_title(unescape(component.get("SUMMARY", ""))) or "(no title)"
+    description = plain_description(unescape(component.get("DESCRIPTION", "")))
+    task = Task(format_date(day), title, label, description, time, "Done" if done else "Open",
+                reminder=component.get("reminder"), recurrence=recurrence, done_dates=done_dates,
+                task_id=uid_task_id(uid) if uid else None)
+    if not uid:
+        # No UID to go by; the id comes from the content, so importing it again is caught
+        task.update(id=content_key(task.text))
+    return task
+
+
+def fold(line):
+    # Content lines longer than 75 octets are folded onto continuation lines
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, start = [], 0
+    while start < len(data):
+        end = min(len(data), start + (75 if not parts else 74))
+        # Don't split a UTF-8 sequence
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode('utf-8'))
+        start = end
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def write_ics(tasks):
+    # Yield an iCalendar file, a few lines per task, without building it in memory
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Python Planner//EN\r\n"
+    for task in tasks:
+        if task.date is None:
+            continue
+        lines = ["BEGIN:VEVENT", f"UID:{task.id}@{UID_DOMAIN}", f"DTSTAMP:{stamp}"]
+        if task.time:
+            hour, minute = task.hour_minute
+            lines.append(f"DTSTART:{task.date:%Y%m%d}T{int(hour):02d}{int(minute):02d}00")
+        else:
+            lines.append(f"DTSTART;VALUE=DATE:{task.date:%Y%m%d}")
+        lines.append(f"SUMMARY:{escape(task.title)}")
+        if task.description:
+            lines.append(f"DESCRIPTION:{escape(task.description)}")
+        lines.append(f"PRIORITY:{ICS_PRIORITY.get(task.priority, 0)}")
+        if task.status == "Done":
+            lines.append("X-PLANNER-STATUS:DONE")
+        if task.recurrence is not None:
+            lines.append(f"RRULE:{task.recurrence.rule}")
+            if task.done_dates:
+                lines.append("X-PLANNER-DONE:" + ",".join(format_date(day) for day in sorted(task.done_dates)))
+        if task.reminder:
+            lines += ["BEGIN:VALARM", "ACTION:DISPLAY", f"DESCRIPTION:{escape(task.title)}",
+                      f"TRIGGER:-PT{task.reminder}M", "END:VALARM"]
+        lines.append("END:VEVENT")
+        yield "".join(fold(line) for line in lines)
+    yield "END:VCALENDAR\r\n"
+
+
+# --- CSV ---
+
+def parse_csv_date(value):
+    # The planner's dd/mm/yy (or dd/mm/yyyy), or ISO yyyy-mm-dd as spreadsheets write it
+    day = parse_task_date(value)
+    if day is None:
+        try:
+            day = date.fromisoformat(value)
+        except ValueError:
+            return None
+    return day
+
+
+def read_csv(lines, errors, source='-'):
+    # Yield a Task per row of a CSV file with a header row naming CSV_FIELDS (title and date
+    # are required, the rest optional). Rows are read as they come.
+    rows = csv.DictReader(lines)
+    for row in rows:
+        where = f"{source}:{rows.line_num}"
+        row = {(key or "").strip().lower(): (value or "").strip() for key, value in row.items()}
+        day = parse_csv_date(row.get("date", ""))
+        if day is None or not row.get("title"):
+            errors.append(f"{where}: needs a title and a date: {row.get('date', '')!r}")
+            continue
+        time = row.get("time") or None
+        if time and parse_time(time) is None:
+            errors.append(f"{where}: invalid time {time!r}")
+            continue
+        priority = row.get("priority", "").capitalize()
+        if priority not in ICS_PRIORITY:
+            priority = "Medium"
+        recurrence = None
+        if row.get("repeat"):
+            try:
+                recurrence = Recurrence(row["repeat"])
+            except ValueError as e:
+                errors.append(f"{where}: {e}; imported as a single task")
+        reminder = int(row["reminder"]) if row.get("reminder", "").isdigit() else None
+        task_id = row.get("id", "").lower()
+        task = Task(format_date(day), plain_title(row["title"]), priority,
+                    plain_description(row.get("description", "")), time,
+                    "Done" if row.get("status", "").lower() == "done" else "Open",
+                    reminder=reminder, recurrence=recurrence,
+                    task_id=task_id if re.match(r"^[0-9a-f]{12}$", task_id) else None)
+        if task.id is None:
+            task.update(id=content_key(task.text))
+        yield task
+
+
+def write_csv(tasks):
+    # Yield a CSV file a row at a time
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    for task in tasks:
+        writer.writerow((task.date.isoformat() if task.date else task.date_str, task.time or "",
+                         task.title, task.priority, task.status, task.description, task.reminder or "",
+                         task.recurrence.rule if task.recurrence else "", task.id or ""))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+# --- Import ---
+
+def known_keys(texts):
+    # Ids and content keys of the tasks already stored
+    keys = set()
+    for text in texts:
+        match = TASK_PATTERN.match(text)
+        if match and match.group("id"):
+            keys.add(match.group("id"))
+        keys.add(content_key(text))
+    return keys
+
+
+def import_tasks(storage, texts, keys, batch=IMPORT_BATCH):
+    # Add task texts to storage in batches of `batch`, each written before the next is read,
+    # leaving out any whose id or content is in `keys` (which is updated). Returns
+    # (imported, duplicates).
+    imported = duplicates = 0
+    pending = []
+    for text in texts:
+        match = TASK_PATTERN.match(text)
+        task_id = match.group("id") if match else None
+        content = content_key(text)
+        if content in keys or (task_id and task_id in keys):
+            duplicates += 1
+            continue
+        keys.add(content)
+        if task_id:
+            keys.add(task_id)
+        pending.append(text)
+        if len(pending) >= batch:
+            storage.add_many(pending)
+            storage.flush()
+            imported += len(pending)
+            pending = []
+    if pending:
+        storage.add_many(pending)
+        storage.flush()
+        imported += len(pending)
+    return imported, duplicates
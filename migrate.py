@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from planner_core import TASK_PATTERN, Recurrence, Task, legacy_task_id, parse_task_date, parse_time
+from storage import JournalStorage, SqliteStorage
+
+# Task texts parsed per worker job: large enough that shipping a chunk to a process costs
+# little next to parsing it
+CHUNK = 5000
+
+PRIORITY_LABELS = ("High", "Medium", "Low", "Done")
+
+
+def read_entries(path):
+    # Task texts of a task file (journal included) or of a file with one task per line
+    if path.endswith('.json'):
+        storage = JournalStorage(path)
+        try:
+            return storage.load()
+        finally:
+            storage.close()
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def check(text):
+    # Why a text can't be migrated, or None. Same grammar as Task.parse, which would keep
+    # such texts as they are rather than reject them.
+    if not isinstance(text, str):
+        return f"not a text: {type(text).__name__}"
+    match = TASK_PATTERN.match(text)
+    if not match:
+        return "not in the task format"
+    if parse_task_date(match.group("date")) is None:
+        return f"unreadable date {match.group('date')!r}"
+    if match.group("label") not in PRIORITY_LABELS:
+        return f"unknown priority {match.group('label')!r}"
+    if match.group("time") and parse_time(match.group("time")) is None:
+        return f"invalid time {match.group('time')!r}"
+    if match.group("rrule"):
+        try:
+            Recurrence(match.group("rrule"))
+        except ValueError as e:
+            return f"unsupported repeat rule: {e}"
+    return None
+
+
+def parse_chunk(texts):
+    # Runs in a worker process. For each text either ("invalid", reason) or ("ok", canonical
+    # text without id, id or None, identity, done, priority or None if stored as [Done]),
+    # identity being what a task and a completed copy of it have in common.
+    results = []
+    for text in texts:
+        reason = check(text)
+        if reason:
+            results.append(("invalid", reason))
+            continue
+        task = Task.parse(text)
+        task_id, task.id = task.id, None
+        identity = (task.date.toordinal(), task.title, task.description, task.time)
+        priority = None if TASK_PATTERN.match(text).group("label") == "Done" else task.priority
+        results.append(("ok", task.format(), task_id, identity, task.status == "Done", priority))
+    return results
+
+
+def parse_all(texts, jobs):
+    # Results of parse_chunk for every text, in order; chunks are spread over `jobs` processes
+    chunks = [texts[start:start + CHUNK] for start in range(0, len(texts), CHUNK)]
+    if jobs <= 1 or len(chunks) <= 1:
+        parsed = map(parse_chunk, chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            parsed = list(pool.map(parse_chunk, chunks))
+    return [result for chunk in parsed for result in chunk]
+
+
+def migrate(texts, jobs=None):
+    # Clean task texts (canonical form, every task with an id) and a report of what was left
+    # out or needs a look. Entries are numbered from 1 in file order.
+    results = parse_all(texts, jobs or os.cpu_count() or 1)
+    report = {"entries": len(texts), "invalid": [], "duplicates": [], "conflicts": []}
+    kept = {}           # entry number -> [canonical text, id, done, priority]
+    by_content = {}     # canonical text -> entry number it's kept as
+    by_identity = {}    # identity -> entry number
+    ids = {}            # id -> entry number
+
+    for number, (text, result) in enumerate(zip(texts, results), 1):
+        if result[0] == "invalid":
+            report["invalid"].append({"entry": number, "text": text, "reason": result[1]})
+            continue
+        _, canonical, task_id, identity, done, priority = result
+
+        if canonical in by_content:
+            report["duplicates"].append({"entry": number, "of": by_content[canonical], "text": text})
+            continue
+        other = by_identity.get(identity)
+        if other is not None:
+            first = kept[other]
+            if done != first[2] and (priority is None or first[3] is None or priority == first[3]):
+                # A completed copy (the "✓" rows mark_complete used to append): the task
+                # is kept once, where it first appeared, as done
+                if done:
+                    first[0], first[2] = canonical, True
+                by_content[canonical] = other
+                report["duplicates"].append({"entry": number, "of": other, "text": text,
+                                             "reason": "completed copy"})
+                continue
+            report["conflicts"].append({"entry": number, "with": other, "text": text,
+                                        "reason": "same date, title and time, different details"})
+        if task_id is not None and task_id in ids:
+            report["conflicts"].append({"entry": number, "with": ids[task_id], "text": text,
+                                        "reason": "id already used; given a new one"})
+            task_id = None
+        by_content[canonical] = number
+        by_identity.setdefault(identity, number)
+        kept[number] = [canonical, task_id, done, priority]
+        if task_id is not None:
+            ids[task_id] = number
+
+    # Tasks without an id get the one the planner would give them on loading, so they keep
+    # the ids they've been shown with
+    clean = []
+    for number in sorted(kept):
+        canonical, task_id = kept[number][:2]
+        if task_id is None:
+            original, n = texts[number - 1], 0
+            while legacy_task_id(original, n) in ids:
+                n += 1
+            task_id = legacy_task_id(original, n)
+            ids[task_id] = number
+        clean.append(f"{canonical} {{id {task_id}}}")
+    report["migrated"] = len(clean)
+    return clean, report
+
+
+def write_store(path, texts):
+    # A task file in the format its extension names: .db (SQLite) or JSON
+    storage = SqliteStorage(path, Task.parse) if path.endswith('.db') else JournalStorage(path)
+    try:
+        storage.compact(texts)
+    finally:
+        storage.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate a task file and migrate it to a clean one.")
+    parser.add_argument('source', help="tasks.json or a file with one task per line")
+    parser.add_argument('--output', help="clean task file: .json or .db (default: SOURCE.migrated.json)")
+    parser.add_argument('--report', default='migration_report.json', help="report file (default: %(default)s)")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per core)")
+    parser.add_argument('--check', action='store_true', help="only report, don't write a task file")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    texts = read_entries(args.source)
+    clean, report = migrate(texts, args.jobs)
+    report["source"] = args.source
+    report["created"] = datetime.now().isoformat(timespec="seconds")
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"{report['entries']} entries: {report['migrated']} tasks, {len(report['invalid'])} unparseable, "
+          f"{len(report['duplicates'])} duplicates, {len(report['conflicts'])} conflicts "
+          f"({time.perf_counter() - started:.2f} s, {args.jobs} job(s))")
+    for item in report["invalid"][:10]:
+        print(f"  entry {item['entry']}: {item['reason']}: {item['text']!r}")
+    print(f"Report written to {args.report}")
+    if not args.check:
+        output = args.output or os.path.splitext(args.source)[0] + '.migrated.json'
+        write_store(output, clean)
+        print(f"Clean tasks written to {output}")
+    return 1 if report["invalid"] or report["conflicts"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,100 @@
+import sys
+
+if __name__ == "__main__" and [arg for arg in sys.argv[1:] if arg != "--profile"]:
+    # Command-line use (python -m planner add ...) doesn't need the GUI libraries,
+    # some of which can't even be imported without a display
+    from planner_cli import main
+    sys.exit(main())
+
 import tkinter as tk
 from tkinter import ttk, simpledialog, messagebox, PhotoImage
+import tkinter.font as tkfont
 from tkcalendar import Calendar
-from datetime import datetime, timedelta
+from bisect import insort
+from calendar import monthrange
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
 import json
 import os
+import queue
+import time
 
 import pystray
 from PIL import Image, ImageDraw
 import threading
 
+from analytics import PRIORITIES, analytics_messages, day_heat
+from archive import ARCHIVE_AFTER_DAYS, Archive, archive_completed, archive_directory
+from history import HISTORY_LIMIT_KB, History
+from instrumentation import Profiler
+from planner_core import (DEFAULT_SORT, INDEX_MIN_TASKS, REPEAT_PRESETS, SUMMARY_TIME, NotificationScheduler,
+                          Recurrence, SortOrder, Task, TaskStore, month_window, parse_task_date,
+                          summary_messages)
+from storage import open_storage
+from sync import SyncClient, SyncedStorage, sync_state_path
+
+# Longest wait between notification checks, so clock changes and sleep are noticed (ms)
+MAX_NOTIFICATION_WAIT = 3600000
+
+# Tasks merged into the store per main-loop turn while loading
+LOAD_CHUNK = 2000
+
+# Months either side of the one on display that are drawn too: their first and last days
+# show in the calendar grid, and they're ready when the user pages to them
+WINDOW_MONTHS = 1
+
+# Calendar colour of a day by its load, open tasks weighted by priority (High 3, Medium 2,
+# Low 1; see analytics.day_heat): (at least this much, tag)
+HEAT_LEVELS = ((10, "heat_4"), (6, "heat_3"), (3, "heat_2"), (1, "heat_1"))
+
+# How often remote changes from the sync server are checked for (ms)
+SYNC_POLL_MS = 500
+
+# View settings kept between sessions (currently the sort order)
+SETTINGS_PATH = 'planner_settings.json'
+
+# Sort orders offered in the sort box; any other combination can be typed in
+SORT_PRESETS = ("date, time", "-priority, date, time", "status, date, time", "title", "-date, -time")
+
+# Command handlers timed when profiling is on
+PROFILED_HANDLERS = ("add_task", "edit_task", "delete_task", "mark_complete", "undo", "redo",
+                     "sort_tasks", "filter_tasks")
+
+# Row background per task label
+PRIORITY_COLORS = {
+    'High': '#ffcdd2',
+    'Medium': '#FFFFC5',
+    'Low': '#c8e6c9',
+    'Done': '#D3D3D3'
+}
+
+
+def load_settings():
+    try:
+        with open(SETTINGS_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_settings(settings):
+    try:
+        with open(SETTINGS_PATH, 'w', encoding='utf-8') as f:
+            json.dump(settings, f)
+    except OSError as e:
+        print(f"Error saving settings: {e}")
+
+
 class PlannerApp:
     def __init__(self, root):
+        self.started = time.perf_counter()
         self.root = root
+        
+        # Opt-in timing (PLANNER_PROFILE=1 or --profile); nothing is wrapped otherwise.
+        # Handlers must be wrapped before the buttons capture them below.
+        self.profiler = Profiler.from_environment(sys.argv)
+        self.profiler.instrument_tk(root)
+        self.profiler.instrument_methods(self, "handler", PROFILED_HANDLERS)
         self.root.title("Planner")
         self.root.geometry('1000x700')
         
@@ -21,8 +104,56 @@ class PlannerApp:
         # Initialize system tray related attributes
         self.icon = None
         self.tray_thread = None
-        self.upcoming_tasks = []
-        self.last_notification_time = datetime.now()
+        
+        # The tray thread only sees an immutable tuple of menu entries published by the
+        # main thread, and hands menu actions back through a queue polled by Tk
+        self.tray_entries = None
+        self.tray_actions = queue.Queue()
+        
+        # Deadline/reminder notifications; one root.after job waits for the next one
+        self.scheduler = NotificationScheduler()
+        self.notification_job = None
+        
+        # In-memory task store (source of truth). The list shows a projection of it: the ids
+        # of the matching tasks in row order, plus an id -> row map built when needed
+        self.storage = open_storage(Task.parse)
+        self.profiler.instrument_storage(self.storage)
+        
+        # Shared planner (PLANNER_SYNC=http://host:port): local changes also become ops for the
+        # sync server. The local files stay the cache, so everything works offline.
+        self.sync = None
+        if os.environ.get('PLANNER_SYNC'):
+            self.sync = SyncClient(os.environ['PLANNER_SYNC'], sync_state_path('tasks.json'))
+            self.storage = SyncedStorage(self.storage, self.sync)
+        
+        # The store keeps itself in the chosen sort order. Task files are saved in store order,
+        # so on the next start tasks load already sorted.
+        self.settings = load_settings()
+        try:
+            order = SortOrder(self.settings.get('sort', DEFAULT_SORT))
+        except ValueError:
+            order = SortOrder(DEFAULT_SORT)
+        # Changes made through the store can be undone; History records them on their way
+        # to storage
+        self.history = History(self.storage, self.settings.get('history_limit_kb', HISTORY_LIMIT_KB))
+        self.tasks = TaskStore(storage=self.history, order=order)
+        
+        # Completed tasks older than `archive_after_days` are moved to the archive once loaded
+        self.archive = Archive(archive_directory('tasks.json'))
+        self.archive_events = {}    # date -> calendar event id of its archived-tasks marker
+        self.view = []
+        self.view_rows = None
+        
+        # While tasks are still loading the store holds only part of the file, so a snapshot
+        # of it would lose the rest; compaction waits until loading is done
+        self.loading = True
+        self.compact_deferred = False
+        
+        # Calendar state per day: date -> (summary, calendar event id)
+        self.day_events = {}
+        
+        # Handlers mark what they changed; it's all redrawn once Tk is idle
+        self.render = RenderScheduler(self)
         
         # Add window close handler
         self.root.protocol('WM_DELETE_WINDOW', self.on_closing)
@@ -45,25 +176,31 @@ class PlannerApp:
         # Create bottom button panel
         self.create_button_panel()
         
-        # Load saved tasks
+        # Start loading saved tasks in the background
         self.load_tasks()
         
         # Start system tray
         self.setup_system_tray()
         
-        self.sort_tasks()            
+        # Idle callbacks run after Tk's pending redraws, i.e. once the window has been drawn
+        self.root.after_idle(self.record_startup_time, 'first_paint')
         
-        # Schedule periodic task updates
-        self.update_upcoming_tasks()
+        # Schedule periodic task updates (reschedules itself every 5 minutes)
         self.root.after(1000, self.update_upcoming_tasks)
-        self.root.after(300000, self.update_upcoming_tasks)  # Update every 5 minutes
+        self.process_tray_actions()
         
-        # Schedule notifications check
-        self.check_notifications()
-        self.root.after(1000, self.check_notifications) #Check after turning on the program
-        self.root.after(60000, self.check_notifications)  # Check every minute
+        # Daily summary; task deadlines are added to the scheduler as tasks load
+        self.schedule_summary()
+        self.arm_notifications()
         
         self.root.after(5000, self.show_today_tasks)
+        
+        self.root.bind('<Control-z>', lambda e: self.undo())
+        self.root.bind('<Control-y>', lambda e: self.redo())
+        self.root.bind('<Control-Z>', lambda e: self.redo())
+        
+        if self.profiler.enabled:
+            self.root.bind('<F12>', lambda e: ProfileWindow(self.root, self.profiler))
     
         # Add these new methods for system tray functionality
     def create_tray_icon(self):
@@ -74,99 +211,119 @@ class PlannerApp:
         return image
     
     def get_upcoming_tasks(self):
-        tasks = []
-        today = datetime.now().date()
-        
-        for i in range(self.listbox_tasks.size()):
-            task = self.listbox_tasks.get(i)
-            try:
-                date_str = task.split(" - ")[0]
-                try:
-                    task_date = datetime.strptime(date_str, "%d/%m/%y").date()
-                except ValueError:
-                    task_date = datetime.strptime(date_str, "%d/%m/%YY").date()
-                
-                # Only include non-completed tasks within the next 7 days
-                if today <= task_date <= today + timedelta(days=7) and "[Done]" not in task:
-                    tasks.append((task_date, task))  # Return tuple with date and task
-            except Exception as e:
-                print(f"Error parsing task date: {e}")
-        
-        # Sort tasks by date
-        return sorted(tasks, key=lambda x: x[0])
+        # Non-completed tasks within the next 7 days as (date, task), sorted by date
+        return self.tasks.upcoming(7)
 
 
     
     def check_notifications(self):
-        if self.icon and (datetime.now() - self.last_notification_time).total_seconds() > 3600:  # Check once per hour
-            upcoming = self.get_upcoming_tasks()
-            today = datetime.now().date()
-            
-            notifications = []
-            
-            # Check for tasks due today
-            today_tasks = [task for date, task in upcoming if date == today]
-            if today_tasks:
-                notifications.append(f"You have {len(today_tasks)} task(s) due today!")
-            
-            # Check for tasks due tomorrow
-            tomorrow = today + timedelta(days=1)
-            tomorrow_tasks = [task for date, task in upcoming if date == tomorrow]
-            if tomorrow_tasks:
-                notifications.append(f"You have {len(tomorrow_tasks)} task(s) due tomorrow!")
-            
-            # Show notification if there are any messages
-            if notifications:
-                notification_text = "\n".join(notifications)
-                self.icon.notify(
-                    title="Upcoming Tasks Reminder",
-                    message=notification_text,
-                    icon=self.icon.icon
-                )
-                self.last_notification_time = datetime.now()
-
-        # Schedule next check
-        self.root.after(60000, self.check_notifications)  # Check every minute
-
-    
-    def create_tray_menu(self):
-        upcoming = self.get_upcoming_tasks()
-        menu_items = []
+        # Summary of what's due today and tomorrow, clashing deadlines and overdue tasks
+        if not self.icon:
+            return
+        notifications = summary_messages(self.tasks) + analytics_messages(self.tasks)
         
-        # Add upcoming tasks to menu
-        for _, task in upcoming[:5]:  # Limit to 5 tasks to avoid too long menu
+        # Show notification if there are any messages
+        if notifications:
+            notification_text = "\n".join(notifications)
+            self.icon.notify(
+                title="Upcoming Tasks Reminder",
+                message=notification_text,
+                icon=self.icon.icon
+            )
+
+    def schedule_summary(self):
+        # Queue the next daily summary
+        now = datetime.now()
+        when = now.replace(hour=SUMMARY_TIME[0], minute=SUMMARY_TIME[1], second=0, microsecond=0)
+        if when <= now:
+            when += timedelta(days=1)
+        self.scheduler.add(when, "summary")
+
+    def arm_notifications(self):
+        # Wait for the earliest scheduled notification with a single timer
+        if self.notification_job:
+            self.root.after_cancel(self.notification_job)
+        next_time = self.scheduler.next_time()
+        delay = MAX_NOTIFICATION_WAIT
+        if next_time is not None:
+            delay = min(delay, max(0, (next_time - datetime.now()).total_seconds() * 1000))
+        self.notification_job = self.root.after(int(delay), self.fire_notifications)
+
+    def fire_notifications(self):
+        self.notification_job = None
+        for when, kind, task in self.scheduler.pop_due():
+            if kind == "summary":
+                self.check_notifications()
+                self.schedule_summary()
+            elif self.icon and kind == "reminder":
+                self.icon.notify(title="Task Reminder",
+                                 message=f"In {task.reminder} min ({task.time}): {task.title}")
+            elif self.icon:
+                self.icon.notify(title="Task Due", message=f"Due now ({task.time}): {task.title}")
+        self.arm_notifications()
+
+    def upcoming_menu_entries(self):
+        entries = []
+        for _, task in self.get_upcoming_tasks()[:5]:  # Limit to 5 tasks to avoid too long menu
             # Truncate task text if too long
-            truncated_task = task[:50] + "..." if len(task) > 50 else task
-            menu_items.append(pystray.MenuItem(truncated_task, lambda: None, enabled=False))
+            text = task.display
+            entries.append(text[:50] + "..." if len(text) > 50 else text)
+        return tuple(entries)
+
+    def create_tray_menu(self, entries):
+        # Only uses `entries` and queue-backed callbacks, so it's safe on either thread
+        menu_items = [pystray.MenuItem(entry, lambda: None, enabled=False) for entry in entries]
         
-        if not upcoming:
+        if not entries:
             menu_items.append(pystray.MenuItem("No upcoming tasks", lambda: None, enabled=False))
         
         # Add separator and standard menu items
         menu_items.extend([
             #pystray.MenuItem("separator", None),
-            pystray.MenuItem("Show Tasks Due Today", self.show_today_tasks),
-            pystray.MenuItem("Show Planner", self.show_window),
-            pystray.MenuItem("Exit", self.quit_app)
+            pystray.MenuItem("Show Tasks Due Today", self.tray_action(self.show_today_tasks)),
+            pystray.MenuItem("Show Planner", self.tray_action(self.show_window)),
+            pystray.MenuItem("Exit", self.tray_action(self.quit_app))
         ])
         
         return menu_items
+
+    def publish_tray_menu(self, force=False):
+        # Main thread only: rebuild the tray menu when its upcoming entries changed
+        entries = self.upcoming_menu_entries()
+        if entries == self.tray_entries and not force:
+            return
+        self.tray_entries = entries
+        if self.icon:
+            self.icon.menu = pystray.Menu(*self.create_tray_menu(entries))
+
+    def tray_action(self, callback):
+        # Menu callbacks run on the tray thread; queue them for the Tk thread instead
+        return lambda: self.tray_actions.put(callback)
+
+    def process_tray_actions(self):
+        while True:
+            try:
+                callback = self.tray_actions.get_nowait()
+            except queue.Empty:
+                break
+            callback()
+        self.root.after(200, self.process_tray_actions)
     
     def show_today_tasks(self):
+        if not self.icon:
+            return
         today = datetime.now().date()
-        upcoming = self.get_upcoming_tasks()
-        today_tasks = [task for date, task in upcoming if date == today]
+        today_tasks = self.tasks.on(today, open_only=True)
         
         if today_tasks:
             formatted_tasks = []
             for task in today_tasks:
-                # Extract time if it exists
-                if "(" in task:
-                    time_str = task[task.rfind("(")+1:task.rfind(")")]
-                    task_without_time = task[:task.rfind("(")].strip()
-                    formatted_tasks.append(f"{time_str} - {task_without_time}")
+                # Prefix with the deadline time if it exists
+                if task.time:
+                    task_without_time = task.display[:task.display.rfind("(")].strip()
+                    formatted_tasks.append(f"{task.time} - {task_without_time}")
                 else:
-                    formatted_tasks.append(task)
+                    formatted_tasks.append(task.display)
                     
             message = "Tasks due today:\n\n" + "\n".join(formatted_tasks)
         else:
@@ -178,13 +335,18 @@ class PlannerApp:
         )
     
     def setup_system_tray(self):
+        self.tray_entries = self.upcoming_menu_entries()
+        tray_image = self.create_tray_icon()
+        
         def run_icon():
             self.icon = pystray.Icon(
                 "PlannerApp",
-                self.create_tray_icon(),
+                tray_image,
                 "Planner",
-                menu=pystray.Menu(*self.create_tray_menu())
+                menu=pystray.Menu(*self.create_tray_menu(self.tray_entries))
             )
+            # Entries may have changed while the icon was being created
+            self.tray_actions.put(lambda: self.publish_tray_menu(force=True))
             self.icon.run()
         
         self.tray_thread = threading.Thread(target=run_icon)
@@ -192,9 +354,8 @@ class PlannerApp:
         self.tray_thread.start()
     
     def update_upcoming_tasks(self):
-        if self.icon:
-            # Update the menu with new upcoming tasks
-            self.icon.menu = pystray.Menu(*self.create_tray_menu())
+        # Update the menu with new upcoming tasks (they shift as days pass)
+        self.publish_tray_menu()
     
         # Schedule next update
         self.root.after(300000, self.update_upcoming_tasks)  # Every 5 minutes
@@ -227,22 +388,26 @@ class PlannerApp:
         search_frame.pack(fill="x", pady=5)
         
         self.search_var = tk.StringVar()
-        self.search_var.trace('w', self.filter_tasks)
+        self.search_var.trace('w', self.schedule_filter)
+        self.filter_job = None
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
         search_entry.pack(side="left", fill="x", expand=True)
         
-        # Task list with scrollbar
-        self.listbox_tasks = tk.Listbox(self.frame_tasks, width=40, height=20, 
-                                      font=('Verdana', 10), selectmode=tk.SINGLE)
-        scrollbar = ttk.Scrollbar(self.frame_tasks, orient="vertical", 
-                                command=self.listbox_tasks.yview)
-        self.listbox_tasks.configure(yscrollcommand=scrollbar.set)
+        # Archived tasks are only searched when asked for; their index is built on first use
+        self.search_archive_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_frame, text="Include archive", variable=self.search_archive_var,
+                        command=self.filter_tasks).pack(side="left", padx=5)
         
-        self.listbox_tasks.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        # Shown while tasks are still being loaded
+        self.progress = ttk.Progressbar(self.frame_tasks, mode='determinate')
+        self.progress.pack(fill="x", pady=(0, 5))
+        
+        # Task list with scrollbar; only the visible rows exist as widgets
+        self.listbox_tasks = VirtualList(self.frame_tasks, self.task_row, font=('Verdana', 10))
+        self.listbox_tasks.pack(fill="both", expand=True)
         
         # Bind double-click to edit
-        self.listbox_tasks.bind('<Double-Button-1>', lambda e: self.edit_task())
+        self.listbox_tasks.bind('<<ItemActivated>>', lambda e: self.edit_task())
 
     def create_calendar_section(self):
         # Calendar frame
@@ -255,14 +420,29 @@ class PlannerApp:
         label_calendar.pack(pady=5)
         
         # Calendar widget
+        today = datetime.now().date()
         self.calendar = Calendar(self.frame_calendar, selectmode='day', 
-                               year=2025, month=1, day=3,
+                               year=today.year, month=today.month, day=today.day,
                                style='Custom.TCalendar',
                                date_pattern='dd/mm/yy')
         self.calendar.pack(fill="both", expand=True)     
+        self.profiler.instrument_calendar(self.calendar)
+        
+        # Event tags are configured once; highlight_tasks only creates/removes events
+        self.calendar.tag_config("highlight", background='lightgreen', foreground='darkgreen')
+        self.calendar.tag_config("completed", background="gray", foreground="white")
+        # Busier days are drawn warmer
+        self.calendar.tag_config("heat_1", background="#fff9c4", foreground="black")
+        self.calendar.tag_config("heat_2", background="#ffe082", foreground="black")
+        self.calendar.tag_config("heat_3", background="#ffb74d", foreground="black")
+        self.calendar.tag_config("heat_4", background="#ef6c00", foreground="white")
+        self.calendar.tag_config("archived", background="#ececec", foreground="#606060")
+        self.calendar.calevent_create(datetime.now().date(), "Today", "highlight")
         
         # Bind calendar selection
         self.calendar.bind('<<CalendarSelected>>', self.on_date_selected)
+        # Only the months around the one on display are drawn
+        self.calendar.bind('<<CalendarMonthChanged>>', self.on_month_changed)
 
     def create_button_panel(self):
         button_frame = ttk.Frame(self.root, style='Custom.TFrame')
@@ -276,8 +456,18 @@ class PlannerApp:
                   style='Custom.TButton').pack(side="left", padx=5)
         ttk.Button(button_frame, text="Mark Complete", command=self.mark_complete, 
                   style='Custom.TButton').pack(side="left", padx=5)
-        ttk.Button(button_frame, text="Sort by Date", command=self.sort_tasks, 
+        ttk.Button(button_frame, text="Undo", command=self.undo, 
+                  style='Custom.TButton').pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Redo", command=self.redo, 
                   style='Custom.TButton').pack(side="left", padx=5)
+        
+        # Sort order: fields in priority order, "-" for descending, e.g. "-priority, date"
+        ttk.Label(button_frame, text="Sort:").pack(side="left", padx=(15, 5))
+        self.sort_var = tk.StringVar(value=self.tasks.order.spec)
+        sort_box = ttk.Combobox(button_frame, textvariable=self.sort_var, values=SORT_PRESETS, width=24)
+        sort_box.pack(side="left", padx=5)
+        sort_box.bind('<<ComboboxSelected>>', lambda e: self.sort_tasks())
+        sort_box.bind('<Return>', lambda e: self.sort_tasks())
 
     def add_task(self):
         selected_date = self.calendar.get_date()
@@ -285,278 +475,593 @@ class PlannerApp:
         # Custom dialog for task details
         dialog = TaskDialog(self.root, "Add Task")
         if dialog.result:
-            title, description, priority, hour, minute = dialog.result
+            title, description, priority, hour, minute, reminder, recurrence = dialog.result
             
             # Create task entry
-            task_text = f"{selected_date} - {title} [{priority}]: {description} ({hour}:{minute})"
-            index = self.listbox_tasks.size()
-            self.listbox_tasks.insert("end", task_text)
-            self.apply_priority_color(index, priority)
-            
+            task = Task(selected_date, title, priority, description, f"{hour}:{minute}",
+                        reminder=reminder, recurrence=recurrence)
+            self.tasks.add(task)
+            self.place_in_view(task)
+            self.scheduler.schedule(task)
+            self.render.mark(rows=True, dates=self.shown_dates(task), notifications=True)
             self.save_tasks()
-            self.highlight_tasks()
 
-    def edit_task(self):
+    def selected_task(self, action):
+        # The task in the selected row, looked up by id; warns and returns None without a selection
         selected_idx = self.listbox_tasks.curselection()
         if not selected_idx:
-            messagebox.showwarning("Warning", "Please select a task to edit")
+            messagebox.showwarning("Warning", f"Please select a task to {action}")
+            return None
+        task = self.tasks.get(self.view[selected_idx[0]])
+        if task is None:
+            messagebox.showinfo("Info", "Archived tasks can't be changed")
+        return task
+
+    def edit_task(self):
+        task = self.selected_task("edit")
+        if task is None:
             return
-            
-        current_task = self.listbox_tasks.get(selected_idx)
-        date, rest = current_task.split(" - ", 1)
-        title = rest.split("[")[0].strip()
-        priority = rest.split("[")[1].split("]")[0] 
-        desc = rest.split("]: ")[1].strip()
-        
-        # Extract hour and minute if they exist
-        hour = "12"  # default values
-        minute = "00"
-        if "(" in desc:
-            time_str = desc[desc.rfind("(")+1:desc.rfind(")")]
-            if ":" in time_str:
-                hour, minute = time_str.split(":")
-            desc = desc[:desc.rfind("(")].strip()
-        #print(hour)
-        #print(minute)
-        
-        
-        dialog = TaskDialog(self.root, "Edit Task", title, desc, priority, hour, minute)
+        hour, minute = task.hour_minute
+        
+        dialog = TaskDialog(self.root, "Edit Task", task.title, task.description,
+                            task.label, hour, minute, task.reminder, task.recurrence)
         if dialog.result:
-            new_title, description, priority, hour, minute = dialog.result
-            task_text = f"{date} - {new_title} [{priority}]: {description} ({hour}:{minute})"
-            self.listbox_tasks.delete(selected_idx)
-            self.listbox_tasks.insert(selected_idx, task_text)
-            self.apply_priority_color(selected_idx, priority)
-            
+            new_title, description, priority, hour, minute, reminder, recurrence = dialog.result
+            old_dates = self.shown_dates(task)
+            # Choosing a priority in the dialog reopens a completed task
+            if priority == "Done":
+                priority, status = task.priority, "Done"
+            else:
+                status = "Open"
+            self.tasks.update(task, title=new_title, description=description, priority=priority,
+                              time=f"{hour}:{minute}", status=status, reminder=reminder,
+                              recurrence=recurrence)
+            self.place_in_view(task)
+            self.scheduler.schedule(task)
+            self.render.mark(rows=True, dates=old_dates | self.shown_dates(task), notifications=True)
             self.save_tasks()
-            self.highlight_tasks()
 
     def delete_task(self):
-        selected_idx = self.listbox_tasks.curselection()
-        if not selected_idx:
-            messagebox.showwarning("Warning", "Please select a task to delete")
+        task = self.selected_task("delete")
+        if task is None:
             return
             
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this task?"):
-            self.listbox_tasks.delete(selected_idx)
+            self.view.remove(task.id)
+            self.view_rows = None
+            self.tasks.remove(task)
+            self.scheduler.unschedule(task)
+            self.listbox_tasks.selected = None
+            self.render.mark(rows=True, dates=self.shown_dates(task))
             self.save_tasks()
-            self.highlight_tasks()
 
     def mark_complete(self):
-        selected_idx = self.listbox_tasks.curselection()
-        if not selected_idx:
-            messagebox.showwarning("Warning", "Please select a task to mark complete")
+        task = self.selected_task("mark complete")
+        if task is None or task.status == "Done":
             return
-                   
-        current_task = self.listbox_tasks.get(selected_idx)
         
-                # Get the task date and update calendar highlight
-        try:
-            task_date_str = current_task.split(" - ")[0]
-            try:
-                task_date = datetime.strptime(task_date_str, "%d/%m/%y").date()
-            except ValueError:
-                task_date = datetime.strptime(task_date_str, "%d/%m/%YY").date()
-                
-            # Create a completed event with gray color
-            self.calendar.calevent_create(task_date, "Completed", "completed")
-            self.calendar.tag_config("completed", background="gray", foreground="white")
-                    
-            #date, rest = current_task.split(" - ", 1)
-            #title = rest.split("[")[0].strip()
-            #desc = rest.split("]: ")[1].strip()
-            
-            date, rest = current_task.split(" - ", 1)
-            title = rest.split("[")[0].strip()
-            priority = rest.split("[")[1].split("]")[0] 
-            desc = rest.split("]: ")[1].strip()
-            
-            # Extract hour and minute if they exist
-            hour = "12"  # default values
-            minute = "00"
-            if "(" in desc:
-                time_str = desc[desc.rfind("(")+1:desc.rfind(")")]
-                if ":" in time_str:
-                    hour, minute = time_str.split(":")
-                desc = desc[:desc.rfind("(")].strip()
-        
-            priority = 'Done'
-            
-            task_text = f"{date} - {title} [{priority}]: {desc} ({hour}:{minute})"
+        # A recurring task completes its occurrence on (or next after) the selected day; a
+        # series whose first occurrences are all done then starts later
+        old_dates = self.shown_dates(task)
+        day = self.tasks.complete(task, self.calendar.selection_get())
+        if day is None:
+            messagebox.showinfo("Info", "This task has no open occurrences left")
+            return
+        # Moves a recurring task's notifications on to its next open occurrence
+        self.scheduler.schedule(task)
+        self.render.mark(rows=True, dates=old_dates | self.shown_dates(task) | {day}, notifications=True)
+        self.save_tasks()
 
-            self.listbox_tasks.delete(selected_idx)
-            print(task_text)
-            self.listbox_tasks.insert(selected_idx, task_text)
-            self.apply_priority_color(selected_idx, priority)
-            
-            self.save_tasks()
-            self.highlight_tasks()
-            
-        except Exception as e:
-            print(f"Error updating calendar for completed task: {e}")
-        
-        if not current_task.endswith("✓"):
-            self.listbox_tasks.delete(selected_idx)
-            completed_task = current_task + " ✓" 
-            self.listbox_tasks.insert(selected_idx, completed_task)
-            self.listbox_tasks.itemconfig(selected_idx, fg='gray')       
-            
-            self.save_tasks()
+    def undo(self, count=1):
+        # Undo the last `count` changes as one batch
+        if not self.history.can_undo():
+            return
+        self.apply_changes(self.history.undo(self.tasks, count))
+
+    def redo(self, count=1):
+        if not self.history.can_redo():
+            return
+        self.apply_changes(self.history.redo(self.tasks, count))
+
+    def apply_changes(self, changes):
+        # Bring the list, calendar and notifications up to date with (old, new) task pairs
+        # made to the store behind the handlers' backs (undo/redo, sync)
+        if not changes:
+            return
+        dates = set()
+        for old, new in changes:
+            for task in (old, new):
+                if task is None:
+                    continue
+                dates |= self.shown_dates(task)
+                if task is old:
+                    self.scheduler.unschedule(task)
+                else:
+                    self.scheduler.schedule(task)
+        self.render.mark(view=True, dates=dates, notifications=True)
+        self.save_tasks()
+
+    def schedule_filter(self, *args):
+        # Debounce typing: only filter once the user pauses
+        if self.filter_job:
+            self.root.after_cancel(self.filter_job)
+        self.filter_job = self.root.after(200, self.filter_tasks)
 
     def filter_tasks(self, *args):
-        search_term = self.search_var.get().lower()
-        self.listbox_tasks.delete(0, tk.END)
+        self.filter_job = None
         
-        # Load all tasks and filter
-        with open('tasks.json', 'r') as f:
-            tasks = json.load(f)
-            
-        for task in tasks:
-            if search_term in task.lower():
-                index = self.listbox_tasks.size()
-                self.listbox_tasks.insert(tk.END, task)
-                # Re-apply colors based on priority
-                if '[High]' in task:
-                    self.apply_priority_color(index, 'High')
-                elif '[Medium]' in task:
-                    self.apply_priority_color(index, 'Medium')
-                elif '[Low]' in task:
-                    self.apply_priority_color(index, 'Low')
-                elif '[Done]' in task:
-                    self.apply_priority_color(index, 'Done')
-
-    def apply_priority_color(self, index, priority):
-        colors = {
-            'High': '#ffcdd2',
-            'Medium': '#FFFFC5',
-            'Low': '#c8e6c9',
-            'Done': '#D3D3D3'
-        }
-        self.listbox_tasks.itemconfig(index, bg=colors.get(priority, '#ffffff'))
-
-    # Override the original save_tasks method to update tray after saving
+        # Free text plus optional field filters, e.g. "review priority:High date:>=01/02/25"
+        query = self.search_var.get()
+        self.view = [task.id for task in self.tasks.search(query)]
+        if self.search_archive_var.get():
+            self.view.extend(task.id for task in self.archive.search(query))
+        self.view_rows = None
+        self.render_tasks()
+
+    def place_in_view(self, task):
+        # Put a task's row where the store order puts it, without re-sorting the view
+        if task.id in self.view:
+            self.view.remove(task.id)
+        insort(self.view, task.id, key=self.view_key)
+        self.view_rows = None
+
+    def view_key(self, task_id):
+        # Live tasks in store order, then the archived ones a search included, as listed
+        task = self.tasks.get(task_id)
+        return (0, self.tasks.position(task)) if task is not None else (1,)
+
+    def task_row(self, task_id):
+        # Text and background colour of a task's row in the list
+        task = self.tasks.get(task_id) or self.archive.get(task_id)
+        return task.display, PRIORITY_COLORS.get(task.label, '#ffffff')
+
+    def render_tasks(self):
+        # Show the current view in the list
+        self.listbox_tasks.set_items(self.view)
+
     def save_tasks(self):
-        tasks = list(self.listbox_tasks.get(0, tk.END))
-        with open('tasks.json', 'w') as f:
-            json.dump(tasks, f)
+        # Changes are already journaled by the store; now and then fold them into a new snapshot
+        if self.storage.needs_compaction():
+            self.compact_storage()
         
-        # Update tray menu after saving
-        if self.icon:
-            self.icon.menu = pystray.Menu(*self.create_tray_menu())
+        # The tray's upcoming tasks may have changed
+        self.render.mark(tray=True)
+
+    def compact_storage(self):
+        # Write the store out as the new snapshot, or once loading is done if it's under way
+        if self.loading:
+            self.compact_deferred = True
+            return
+        self.storage.compact(task.text for task in self.tasks)
 
     def load_tasks(self):
-        if os.path.exists('tasks.json'):
-            with open('tasks.json', 'r') as f:
-                tasks = json.load(f)
-                for task in tasks:
-                    index = self.listbox_tasks.size()
-                    self.listbox_tasks.insert(tk.END, task)
-                    # Apply colors based on priority
-                    if '[High]' in task:
-                        self.apply_priority_color(index, 'High')
-                    elif '[Medium]' in task:
-                        self.apply_priority_color(index, 'Medium')
-                    elif '[Low]' in task:
-                        self.apply_priority_color(index, 'Low')
-                    elif '[Done]' in task:
-                        self.apply_priority_color(index, 'Done')
-        self.highlight_tasks()
-
-    def highlight_tasks(self):
-        tasks = self.listbox_tasks.get(0, "end")
-        self.calendar.calevent_remove("all")
+        # Tasks are read and parsed on a worker thread and merged into the store a chunk
+        # at a time from the main loop, so the window is usable while a large file loads
+        self.load_queue = queue.Queue()
+        threading.Thread(target=self.read_tasks, daemon=True).start()
+        self.root.after(1, self.merge_loaded_tasks)
+
+    def read_tasks(self):
+        # Runs on the loader thread: the current month first, then everything else in date order
+        try:
+            texts = self.storage.load()
+        except Exception as e:
+            print(f"Error loading tasks: {e}")
+            texts = []
+        self.load_queue.put(len(texts))
         
         today = datetime.now().date()
-        self.calendar.calevent_create(today, "Today", "highlight")  
-        self.calendar.tag_config("highlight", background='lightgreen', foreground='darkgreen')
+        dates = [parse_task_date(text.split(" - ")[0]) for text in texts]
+        current = [text for text, day in zip(texts, dates)
+                   if day and (day.year, day.month) == (today.year, today.month)]
+        self.load_queue.put([Task.parse(text) for text in current])
         
-        for task in tasks:
-            try:
-                task_date_str = task.split(" - ")[0]  # Get the date part
-                parts = task.split("[")
-                status = parts[1].split("]")[0]
-                #print(status)
-                # First try to parse the shorter format (MM/DD/YY)
-                try:
-                    task_date = datetime.strptime(task_date_str, "%d/%m/%y").date()
-                except ValueError:
-                    # If that fails, try the full format (DD/MM/YYYY)
-                    task_date = datetime.strptime(task_date_str, "%d/%m/%YY").date()
-                
-                if status == 'Done':
-                    #print(task)
-                    self.calendar.calevent_create(task_date, "Completed task", "completed")
-                    self.calendar.tag_config("completed", background="gray", foreground="white")
-                elif status == 'High':
-                    self.calendar.calevent_create(task_date, "Task High", "task_high")
-                    self.calendar.tag_config("task_high", background="#ffcdd2", foreground="black")
-                elif status == 'Low':
-                    self.calendar.calevent_create(task_date, "Task Low", "task_low")
-                    self.calendar.tag_config("task_low", background="#c8e6c9", foreground="black")
+        rest = [text for text, day in zip(texts, dates)
+                if not day or (day.year, day.month) != (today.year, today.month)]
+        for start in range(0, len(rest), LOAD_CHUNK):
+            self.load_queue.put([Task.parse(text) for text in rest[start:start + LOAD_CHUNK]])
+        self.load_queue.put(None)
+
+    def merge_loaded_tasks(self):
+        # Merge at most one chunk per call to keep the UI responsive
+        try:
+            item = self.load_queue.get_nowait()
+        except queue.Empty:
+            self.root.after(10, self.merge_loaded_tasks)
+            return
+        
+        if item is None:
+            self.finish_loading()
+            return
+        if isinstance(item, int):
+            self.progress.configure(maximum=max(item, 1))
+            if item >= INDEX_MIN_TASKS:
+                # Large enough for the search index: each chunk is indexed as it's merged,
+                # so the first search doesn't have to build it
+                self.tasks.text_index.start()
+        else:
+            self.tasks.extend(item)
+            self.view.extend(task.id for task in item)
+            self.view_rows = None
+            for task in item:
+                self.scheduler.schedule(task)
+            # Only the month window is drawn, whatever dates the chunk covers
+            self.render.mark(rows=True, calendar=True)
+            self.progress.step(len(item))
+        self.root.after(1, self.merge_loaded_tasks)
+
+    def finish_loading(self):
+        self.progress.pack_forget()
+        self.loading = False
+        if self.compact_deferred:
+            self.compact_deferred = False
+            self.compact_storage()
+        
+        self.archive_old_tasks()
+        
+        # The store is already in sort order; re-apply any search typed meanwhile
+        self.render.mark(view=True, calendar=True, tray=True, notifications=True)
+        if self.sync:
+            self.sync.start(self.tasks)
+            self.process_sync()
+        self.record_startup_time('tasks_loaded')
+
+    def archive_old_tasks(self):
+        # Keep the live store to open and recently completed tasks
+        days = self.settings.get('archive_after_days', ARCHIVE_AFTER_DAYS)
+        # Archiving is local housekeeping: it isn't undoable, and other planners keep the tasks
+        try:
+            with self.history.pausing(), (self.sync.muting() if self.sync else nullcontext()):
+                archived = archive_completed(self.tasks, self.archive, days)
+        except OSError as e:
+            print(f"Error archiving tasks: {e}")
+            return
+        if self.sync:
+            for task in archived:
+                self.sync.forget(task.text)
+        if archived:
+            self.compact_storage()
+            self.render.mark(dates={task.date for task in archived})
+
+    def process_sync(self):
+        # Apply changes received from the sync server, then check again shortly
+        # Other people's changes aren't ours to undo
+        with self.history.pausing():
+            changes = self.sync.poll()
+        self.apply_changes(changes)
+        self.root.after(SYNC_POLL_MS, self.process_sync)
+
+    def record_startup_time(self, name):
+        # Time since PlannerApp was created, as startup.first_paint / startup.tasks_loaded in
+        # the profile (--profile)
+        self.profiler.record(f"startup.{name}", time.perf_counter() - self.started)
+
+    def window_months(self):
+        # (year, month) of the month on display and WINDOW_MONTHS either side of it
+        return month_window(self.calendar.get_displayed_month(), WINDOW_MONTHS)
+
+    def displayed_range(self):
+        # First and last day of the month window
+        months = self.window_months()
+        (first_year, first_month), (last_year, last_month) = months[0], months[-1]
+        return (date(first_year, first_month, 1),
+                date(last_year, last_month, monthrange(last_year, last_month)[1]))
+
+    def shown_dates(self, task):
+        # Calendar days a task affects: its date, or its occurrences around the month on display
+        if task.recurrence is None:
+            return {task.date}
+        return set(task.occurrences(*self.displayed_range()))
+
+    def highlight_tasks(self, dates=None):
+        # Sync calendar events with the per-day summaries of the given dates; only days in the
+        # month window have events. Without dates the whole window is redrawn from the store's
+        # per-month summaries and days that have left it are cleared. Only days whose summary
+        # changed get their event replaced.
+        first, last = self.displayed_range()
+        if dates is None:
+            summaries = {}
+            for year, month in self.window_months():
+                summaries.update(self.tasks.month_summary(year, month))
+            dates = set(self.day_events).union(summaries)
+        else:
+            summaries = {day: self.tasks.summary(day) for day in dates if day and first <= day <= last}
+        
+        for day in dates:
+            summary = summaries.get(day)
+            previous = self.day_events.get(day)
+            if previous and previous[0] == summary:
+                continue
+            
+            if previous:
+                self.calendar.calevent_remove(previous[1])
+                del self.day_events[day]
+            if summary:
+                strongest, open_count, done_count, by_priority = summary
+                heat = day_heat(summary)
+                tag = next((tag for least, tag in HEAT_LEVELS if heat >= least), "completed")
+                if open_count:
+                    counts = ", ".join(f"{count} {priority}" for priority, count in zip(PRIORITIES, by_priority) if count)
+                    text = f"{open_count} open ({counts}), {done_count} done"
                 else:
-                    self.calendar.calevent_create(task_date, "Task Medium", "task_medium")
-                    self.calendar.tag_config("task_medium", background="#FFFFC5", foreground="black")
-                       
-            except Exception as e:
-                print(f"Error highlighting date for task '{task}': {e}")
+                    text = f"{done_count} done"
+                event_id = self.calendar.calevent_create(day, text, tag)
+                self.day_events[day] = (summary, event_id)
+
+    def on_month_changed(self, event):
+        # Paging through several months before Tk is idle draws only the last
+        self.render.mark(calendar=True)
+
+    def show_archived_month(self):
+        # Mark days of the month on display that have archived tasks; an archived month is
+        # only read when it's first shown
+        month, year = self.calendar.get_displayed_month()
+        if not self.archive.has_month(year, month):
+            return
+        counts = {}
+        for task in self.archive.month(year, month):
+            counts[task.date] = counts.get(task.date, 0) + 1
+        for day, count in counts.items():
+            if day in self.archive_events:
+                self.calendar.calevent_remove(self.archive_events[day])
+            self.archive_events[day] = self.calendar.calevent_create(day, f"{count} archived", "archived")
 
     def on_date_selected(self, event):
-        selected_date = self.calendar.get_date()
-        # Highlight tasks for selected date
-        for i in range(self.listbox_tasks.size()):
-            task = self.listbox_tasks.get(i)
-            if task.startswith(selected_date):
-                self.listbox_tasks.selection_clear(0, tk.END)
-                self.listbox_tasks.selection_set(i)
-                self.listbox_tasks.see(i)
-                break
+        selected_date = self.calendar.selection_get()
+        # Select the first listed task due that day: the day's tasks come from the date index,
+        # their rows from the id -> row map
+        if self.view_rows is None:
+            self.view_rows = {task_id: row for row, task_id in enumerate(self.view)}
+        rows = [self.view_rows[task.source.id] for task in self.tasks.on(selected_date)
+                if task.source.id in self.view_rows]
+        if rows:
+            self.listbox_tasks.selection_set(min(rows))
+            self.listbox_tasks.see(min(rows))
 
     def sort_tasks(self):
-        # Get all tasks
-        tasks = list(self.listbox_tasks.get(0, tk.END))
+        try:
+            order = SortOrder(self.sort_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.sort_var.set(order.spec)
+        if order == self.tasks.order:
+            return
         
-        # Sort tasks based on date
-        def get_task_date(task):
-            date_str = task.split(" - ")[0]
-            try:
-                # Try both date formats
-                try:
-                    return datetime.strptime(date_str, "%d/%m/%y").date()
-                except ValueError:
-                    return datetime.strptime(date_str, "%d/%m/%YY").date()
-            except Exception:
-                # Return a far future date for invalid dates
-                return datetime.max.date()
-
-        # Sort the tasks
-        sorted_tasks = sorted(tasks, key=get_task_date)
-        
-        # Clear and reinsert tasks
-        self.listbox_tasks.delete(0, tk.END)
-        for task in sorted_tasks:
-            index = self.listbox_tasks.size()
-            self.listbox_tasks.insert(tk.END, task)
-            # Reapply colors based on priority
-            if '[High]' in task:
-                self.apply_priority_color(index, 'High')
-            elif '[Medium]' in task:
-                self.apply_priority_color(index, 'Medium')
-            elif '[Low]' in task:
-                self.apply_priority_color(index, 'Low')
-            elif '[Done]' in task:
-                self.apply_priority_color(index, 'Done')
-        
-        # Update calendar highlights
-        self.highlight_tasks()
+        # Sort the store once; keys are kept, later adds and edits are placed by bisection
+        self.tasks.sort(order)
+        self.settings['sort'] = order.spec
+        save_settings(self.settings)
+        # Save in the new order so the next start doesn't need to sort
+        self.compact_storage()
+        
+        # The list is a projection of the store, so rebuilding it picks up the new order;
+        # sorting doesn't change the calendar
+        self.render.mark(view=True)
+
+class RenderScheduler:
+    """Coalesces UI updates into one redraw per idle turn of the Tk loop.
+    
+    Changes to tasks mark parts of the window dirty: the list's view (re-filter) or just
+    its rows (redraw), calendar days or the whole month window, the tray menu and the
+    notification timer. The first mark queues a single after_idle callback that applies
+    everything marked by then, so fifty quick changes cost one redraw.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.job = None
+        self.reset()
+
+    def reset(self):
+        self.view = False           # list contents must be rebuilt from the search
+        self.rows = False           # list rows must be redrawn
+        self.dates = set()          # calendar days whose events may have changed
+        self.calendar = False       # the whole month window must be redrawn
+        self.tray = False
+        self.notifications = False  # the notification timer must be re-armed
+
+    def mark(self, view=False, rows=False, dates=(), calendar=False, tray=False, notifications=False):
+        self.view |= view
+        self.rows |= rows
+        self.dates.update(dates)
+        self.calendar |= calendar
+        self.tray |= tray
+        self.notifications |= notifications
+        if self.job is None:
+            self.job = self.app.root.after_idle(self.redraw)
+
+    def redraw(self):
+        self.job = None
+        view, rows, dates, calendar = self.view, self.rows, self.dates, self.calendar
+        tray, notifications = self.tray, self.notifications
+        self.reset()
+        
+        app = self.app
+        if view:
+            app.filter_tasks()
+        elif rows:
+            app.listbox_tasks.refresh()
+        if calendar:
+            app.highlight_tasks()
+            app.show_archived_month()
+        elif dates:
+            app.highlight_tasks(dates)
+        if tray:
+            app.publish_tray_menu()
+        if notifications:
+            app.arm_notifications()
+
+
+class VirtualList(ttk.Frame):
+    """Scrollable single-selection list that only creates widgets for the rows on screen.
+    
+    Rows are a fixed pool of labels; scrolling rebinds them to other items. `render`
+    maps an item to its (text, background) and double-click/Enter fires <<ItemActivated>>.
+    """
+
+    def __init__(self, parent, render, font=('Verdana', 10)):
+        super().__init__(parent)
+        self.render = render
+        self.font = font
+        self.items = []
+        self.rows = []
+        self.first = 0          # index of the item shown in the top row
+        self.selected = None    # index of the selected item
+        self.row_height = tkfont.Font(font=font).metrics("linespace") + 4
+        
+        self.body = tk.Frame(self, bg='white', highlightthickness=1, highlightbackground='#a0a0a0',
+                             width=320, height=20 * self.row_height, takefocus=1)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.body.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        
+        self.body.bind('<Configure>', self.on_resize)
+        self.body.bind('<Up>', lambda e: self.move_selection(-1))
+        self.body.bind('<Down>', lambda e: self.move_selection(1))
+        self.body.bind('<Return>', lambda e: self.activate())
+        self.bind_wheel(self.body)
+
+    def bind_wheel(self, widget):
+        widget.bind('<MouseWheel>', lambda e: self.yview('scroll', -1 if e.delta > 0 else 1, 'units'))
+        widget.bind('<Button-4>', lambda e: self.yview('scroll', -1, 'units'))
+        widget.bind('<Button-5>', lambda e: self.yview('scroll', 1, 'units'))
+
+    def on_resize(self, event):
+        # Grow or shrink the row pool to fit the new height
+        count = max(1, event.height // self.row_height)
+        while len(self.rows) < count:
+            row = tk.Label(self.body, anchor='w', font=self.font, bd=0, padx=4)
+            position = len(self.rows)
+            row.place(x=0, y=position * self.row_height, relwidth=1, height=self.row_height)
+            row.bind('<Button-1>', lambda e, p=position: self.click(p))
+            row.bind('<Double-Button-1>', lambda e, p=position: self.activate(p))
+            self.bind_wheel(row)
+            self.rows.append(row)
+        while len(self.rows) > count:
+            self.rows.pop().destroy()
+        self.redraw()
+
+    def redraw(self):
+        self.first = max(0, min(self.first, len(self.items) - len(self.rows)))
+        for position, row in enumerate(self.rows):
+            index = self.first + position
+            if index >= len(self.items):
+                row.configure(text="", bg='white')
+                continue
+            text, background = self.render(self.items[index])
+            if index == self.selected:
+                row.configure(text=text, bg='#0078d7', fg='white')
+            else:
+                row.configure(text=text, bg=background, fg='black')
+        
+        if self.items:
+            self.scrollbar.set(self.first / len(self.items),
+                               min(1.0, (self.first + len(self.rows)) / len(self.items)))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.first = int(float(args[1]) * len(self.items))
+        elif args[0] == 'scroll':
+            step = len(self.rows) if args[2] == 'pages' else 1
+            self.first += int(args[1]) * step
+        self.redraw()
+
+    def set_items(self, items):
+        # Show a new list of items, scrolled to the top
+        self.items = items
+        self.first = 0
+        self.selected = None
+        self.redraw()
+
+    def refresh(self):
+        # Redraw after the items list was changed in place
+        if self.selected is not None and self.selected >= len(self.items):
+            self.selected = None
+        self.redraw()
+
+    def size(self):
+        return len(self.items)
+
+    def curselection(self):
+        return () if self.selected is None else (self.selected,)
+
+    def selection_clear(self):
+        self.selected = None
+        self.redraw()
+
+    def selection_set(self, index):
+        self.selected = index
+        self.redraw()
+
+    def see(self, index):
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + len(self.rows):
+            self.first = index - len(self.rows) + 1
+        self.redraw()
+
+    def click(self, position):
+        self.body.focus_set()
+        if self.first + position < len(self.items):
+            self.selection_set(self.first + position)
+
+    def move_selection(self, step):
+        if not self.items:
+            return
+        index = 0 if self.selected is None else self.selected + step
+        index = max(0, min(index, len(self.items) - 1))
+        self.selection_set(index)
+        self.see(index)
+
+    def activate(self, position=None):
+        if position is not None:
+            self.click(position)
+        if self.selected is not None:
+            self.event_generate('<<ItemActivated>>')
+
+
+class ProfileWindow:
+    """Live view of the profiler's timings and counters (F12 when profiling)."""
+
+    def __init__(self, parent, profiler):
+        self.profiler = profiler
+        self.window = tk.Toplevel(parent)
+        self.window.title("Profile")
+        self.window.geometry('760x420')
+        
+        self.text = tk.Text(self.window, font=('Courier', 9), wrap="none")
+        self.text.pack(fill="both", expand=True)
+        
+        button_frame = ttk.Frame(self.window)
+        button_frame.pack(fill="x", pady=5)
+        ttk.Button(button_frame, text="Save", command=self.save).pack(side="left", padx=5)
+        self.status = ttk.Label(button_frame, text="")
+        self.status.pack(side="left", padx=5)
+        self.refresh()
+
+    def refresh(self):
+        if not self.window.winfo_exists():
+            return
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", self.profiler.report())
+        self.window.after(1000, self.refresh)
+
+    def save(self):
+        self.status.configure(text=f"Saved to {self.profiler.dump()}")
+
 
 class TaskDialog:
-    def __init__(self, parent, title, default_title="", desc="", prio="Medium", h="12", m="00"):
+    def __init__(self, parent, title, default_title="", desc="", prio="Medium", h="12", m="00", remind=None,
+                 recurrence=None):
         self.result = None
         
         # Create dialog window
         self.dialog = tk.Toplevel(parent)
         self.dialog.title(title)
-        self.dialog.geometry('400x400')
+        self.dialog.geometry('400x500')
         
         # Title entry
         ttk.Label(self.dialog, text="Title:").pack(pady=5)
@@ -589,6 +1094,24 @@ class TaskDialog:
         self.hour_var.set(h)
         self.minute_var.set(m)
         
+        # Reminder before the deadline (0 = none)
+        remind_frame = ttk.Frame(self.dialog)
+        remind_frame.pack(pady=5)
+        ttk.Label(remind_frame, text="Remind minutes before:").pack(side="left", padx=5)
+        self.remind_var = tk.StringVar(value=str(remind or 0))
+        ttk.Spinbox(remind_frame, from_=0, to=1440, increment=5, textvariable=self.remind_var,
+                    width=5).pack(side="left", padx=5)
+        
+        # Repeat: a preset or any supported RRULE typed in
+        repeat_frame = ttk.Frame(self.dialog)
+        repeat_frame.pack(pady=5)
+        ttk.Label(repeat_frame, text="Repeat:").pack(side="left", padx=5)
+        presets = {rule: name for name, rule in REPEAT_PRESETS.items()}
+        rule = recurrence.rule if recurrence else ""
+        self.repeat_var = tk.StringVar(value=presets.get(rule, rule) or "None")
+        ttk.Combobox(repeat_frame, textvariable=self.repeat_var, width=25,
+                     values=["None"] + list(REPEAT_PRESETS)).pack(side="left", padx=5)
+        
         # Priority selection
         ttk.Label(self.dialog, text="Priority:").pack(pady=5)
         self.priority_var = tk.StringVar(value=prio)
@@ -611,15 +1134,35 @@ class TaskDialog:
         print(f"Selected time: {selected_time}")
 
     def ok(self):
+        try:
+            recurrence = self.recurrence()
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid repeat rule: {e}", parent=self.dialog)
+            return
         self.result = (
             self.title_entry.get(),
             self.desc_entry.get("1.0", tk.END).strip(),
             self.priority_var.get(),
             self.hour_var.get(),
-            self.minute_var.get()
+            self.minute_var.get(),
+            self.reminder(),
+            recurrence
         )
         self.dialog.destroy()
 
+    def reminder(self):
+        try:
+            minutes = int(self.remind_var.get())
+        except ValueError:
+            return None
+        return minutes if minutes > 0 else None
+
+    def recurrence(self):
+        rule = self.repeat_var.get().strip()
+        if not rule or rule == "None":
+            return None
+        return Recurrence(REPEAT_PRESETS.get(rule, rule))
+
     def cancel(self):
         self.dialog.destroy()
 
@@ -628,3 +1171,10 @@ if __name__ == "__main__":
     root = tk.Tk()
     app = PlannerApp(root)
     root.mainloop()
+    # Write out anything still queued before exiting
+    app.storage.close()
+    if app.sync:
+        app.sync.close()
+    if app.profiler.enabled:
+        print(app.profiler.report())
+        print(f"Profile written to {app.profiler.dump()}")
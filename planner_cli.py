@@ -0,0 +1,328 @@
+import argparse
+import json
+import os
+import sys
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from analytics import CLASH_WINDOW, PRIORITIES, analytics_messages, clashes, overdue, weekly_load
+from archive import ARCHIVE_AFTER_DAYS, Archive, archive_completed, archive_directory
+from instrumentation import Profiler
+from interchange import import_tasks, known_keys, read_csv, read_ics, write_csv, write_ics
+from planner_core import (DEFAULT_SORT, REPEAT_PRESETS, TASK_PATTERN, Recurrence, SortOrder, Task, TaskStore,
+                          format_date, parse_task_date, parse_time, summary_messages)
+from storage import open_storage
+from sync import SyncClient, SyncedStorage, sync_state_path
+
+
+EXPORT_FORMATS = ('json', 'lines', 'ics', 'csv')
+
+
+def load_store(storage):
+    # Everything in storage, with further changes recorded back to it
+    return TaskStore((Task.parse(text) for text in storage.load()), storage)
+
+
+def numbered(store, tasks, ids=False):
+    # "N. text" lines; N is the task's position in storage, as used by `complete`.
+    # Occurrences of a recurring task share the number of their series.
+    positions = {task: number for number, task in enumerate(store, 1)}
+    if ids:
+        return [f"{positions[task.source]}. [{task.source.id}] {task.display}" for task in tasks]
+    return [f"{positions[task.source]}. {task.display}" for task in tasks]
+
+
+def read_task_texts(paths, errors):
+    # Yield task texts from JSON lists, iCalendar (.ics) or CSV (.csv) files, or plain files
+    # with one task per line ("-" is stdin). All but JSON are read lazily, so large imports
+    # are streamed.
+    for path in paths:
+        if path.endswith('.ics'):
+            with open(path, 'r', encoding='utf-8-sig') as f:
+                yield from (task.text for task in read_ics(f, errors, path))
+        elif path.endswith('.csv'):
+            with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+                yield from (task.text for task in read_csv(f, errors, path))
+        elif path.endswith('.json'):
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = json.load(f)
+            yield from validated(lines, path, errors)
+        elif path == '-':
+            yield from validated((line.rstrip("\n") for line in sys.stdin), path, errors)
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                yield from validated((line.rstrip("\n") for line in f), path, errors)
+
+
+def validated(lines, path, errors):
+    for number, text in enumerate(lines, 1):
+        if not text.strip():
+            continue
+        match = TASK_PATTERN.match(text)
+        if not match or parse_task_date(match.group("date")) is None:
+            errors.append(f"{path}:{number}: not a task: {text!r}")
+            continue
+        yield text
+
+
+def command_add(storage, args):
+    if parse_task_date(args.date) is None:
+        print(f"Invalid date: {args.date} (expected dd/mm/yy)", file=sys.stderr)
+        return 1
+    if parse_time(args.time) is None:
+        print(f"Invalid time: {args.time} (expected HH:MM)", file=sys.stderr)
+        return 1
+    recurrence = None
+    if args.repeat:
+        try:
+            recurrence = Recurrence(REPEAT_PRESETS.get(args.repeat.capitalize(), args.repeat))
+        except ValueError as e:
+            print(f"Invalid repeat rule: {e}", file=sys.stderr)
+            return 1
+    task = Task(args.date, args.title, args.priority, args.description, args.time, reminder=args.remind,
+                recurrence=recurrence)
+    storage.add(task.text)
+    print(f"[{task.id}] {task.display}")
+    return 0
+
+
+def command_list(storage, args):
+    try:
+        order = SortOrder(args.sort)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.archived:
+        # Archived tasks have no number: they can't be completed or changed
+        archived = Archive(archive_directory(args.file)).store()
+        tasks = archived.search(" ".join(args.query)) if args.query else list(archived)
+        for task in sorted(tasks, key=order.key):
+            print(f"[{task.id}] {task.display}" if args.ids else task.display)
+        return 0
+    store = load_store(storage)
+    tasks = store.search(" ".join(args.query)) if args.query else list(store)
+    for line in numbered(store, sorted(tasks, key=order.key), args.ids):
+        print(line)
+    return 0
+
+
+def command_upcoming(storage, args):
+    store = load_store(storage)
+    for message in summary_messages(store) + analytics_messages(store):
+        print(message)
+    for line in numbered(store, [task for _, task in store.upcoming(args.days)]):
+        print(line)
+    return 0
+
+
+def command_stats(storage, args):
+    store = load_store(storage)
+    today = datetime.now().date()
+    last = today + timedelta(days=args.days)
+
+    print(f"Clashing deadlines, {format_date(today)} to {format_date(last)}:")
+    found = clashes(store, today, last, args.window)
+    for clash in found:
+        print(f"  {format_date(clash.start.date())}: {clash.describe()}")
+        for line in numbered(store, [task for _, task in clash.tasks]):
+            print(f"    {line}")
+    if not found:
+        print("  none")
+
+    print("Open tasks per week (" + ", ".join(PRIORITIES) + "), done:")
+    monday = today - timedelta(days=today.weekday())
+    for week, counts in sorted(weekly_load(store, monday, last).items()):
+        print(f"  week of {format_date(week)}: " + ", ".join(map(str, counts[:3])) + f"; {counts[3]} done")
+
+    late = overdue(store)
+    print(f"Overdue: {len(late)}")
+    for line in numbered(store, late):
+        print(f"  {line}")
+    return 0
+
+
+def command_complete(storage, args):
+    store = load_store(storage)
+    tasks = None
+    status = 0
+    for key in args.tasks:
+        # A number from `list`, or a task id
+        if key.isdigit():
+            tasks = tasks or list(store)
+            task = tasks[int(key) - 1] if 1 <= int(key) <= len(tasks) else None
+        else:
+            task = store.get(key)
+        if task is None:
+            print(f"No task {key}", file=sys.stderr)
+            status = 1
+            continue
+        # A recurring task has its next open occurrence from today completed
+        day = store.complete(task)
+        if task.recurrence is not None and day is None:
+            print(f"Task {key} has no open occurrences left", file=sys.stderr)
+            status = 1
+            continue
+        print(task.display)
+    return status
+
+
+def command_import(storage, args):
+    errors = []
+    # Written in batches as the files are read; tasks already stored (same id or same
+    # content) and repeats within the files are left out
+    imported, duplicates = import_tasks(storage, read_task_texts(args.files, errors), known_keys(storage.load()))
+    for error in errors:
+        print(error, file=sys.stderr)
+    print(f"Imported {imported} task(s), {duplicates} already there, {len(errors)} problem(s)")
+    return 1 if errors else 0
+
+
+def command_export(storage, args):
+    extension = os.path.splitext(args.output)[1].lstrip('.').lower()
+    export_format = args.format or (extension if extension in ('ics', 'csv') else 'json')
+    newline = '' if export_format in ('ics', 'csv') else None
+    out = open(args.output, 'w', encoding='utf-8', newline=newline) if args.output != '-' else sys.stdout
+    try:
+        if export_format == 'json':
+            json.dump(storage.load(), out, ensure_ascii=False, indent=2)
+            out.write("\n")
+        elif export_format == 'lines':
+            for text in storage.load():
+                out.write(text + "\n")
+        else:
+            # Tasks are written out one at a time
+            write = write_ics if export_format == 'ics' else write_csv
+            for chunk in write(load_store(storage)):
+                out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def command_archive(storage, args):
+    store = load_store(storage)
+    archive = Archive(archive_directory(args.file))
+    # Archiving is local: other planners sharing the tasks keep them
+    client = args.client
+    try:
+        with client.muting() if client else nullcontext():
+            archived = archive_completed(store, archive, args.older_than)
+    except OSError as e:
+        print(f"Error archiving tasks: {e}", file=sys.stderr)
+        return 1
+    if client:
+        for task in archived:
+            client.forget(task.text)
+    if archived:
+        storage.compact(task.text for task in store)
+    print(f"Archived {len(archived)} completed task(s) to {archive.directory}, {len(store)} left")
+    return 0
+
+
+def command_sync(storage, args):
+    if not args.client:
+        print("No sync server: use --sync URL or set PLANNER_SYNC", file=sys.stderr)
+        return 1
+    store = load_store(storage)
+    try:
+        changes = args.client.sync_now(store)
+    except (OSError, ValueError) as e:
+        print(f"Sync failed, local changes kept for next time: {e}", file=sys.stderr)
+        return 1
+    received = sum(1 for old, new in changes if new is not None)
+    removed = sum(1 for old, new in changes if new is None)
+    print(f"Synced with {args.client.url}: {received} task(s) received, {removed} removed, "
+          f"{len(store)} in total")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m planner", description="Planner from the command line.")
+    parser.add_argument('--file', default='tasks.json', help="task file (default: tasks.json)")
+    parser.add_argument('--profile', action='store_true',
+                        help="time the command and storage writes (also PLANNER_PROFILE=1)")
+    parser.add_argument('--sync', metavar='URL', default=os.environ.get('PLANNER_SYNC'),
+                        help="sync server; changes are recorded for it (also PLANNER_SYNC)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help="add a task")
+    add.add_argument('date', help="dd/mm/yy")
+    add.add_argument('title')
+    add.add_argument('-p', '--priority', default='Medium', choices=['High', 'Medium', 'Low'])
+    add.add_argument('-d', '--description', default='')
+    add.add_argument('-t', '--time', default='12:00', help="deadline HH:MM (default: 12:00)")
+    add.add_argument('-r', '--remind', type=int, help="reminder, minutes before the deadline")
+    add.add_argument('--repeat', help="daily, weekly, monthly, yearly or an RRULE such as FREQ=WEEKLY;BYDAY=MO,WE")
+    add.set_defaults(handler=command_add)
+
+    list_ = commands.add_parser('list', help="list tasks, optionally filtered like the search box")
+    list_.add_argument('query', nargs='*', help='e.g. review priority:High date:>=01/02/25')
+    list_.add_argument('--ids', action='store_true', help="also show each task's id")
+    list_.add_argument('--archived', action='store_true', help="list archived tasks instead")
+    list_.add_argument('--sort', default=DEFAULT_SORT,
+                       help='fields to sort by, "-" for descending, e.g. "-priority,date" (default: date)')
+    list_.set_defaults(handler=command_list)
+
+    upcoming = commands.add_parser('upcoming', help="open tasks due in the next days")
+    upcoming.add_argument('--days', type=int, default=7)
+    upcoming.set_defaults(handler=command_upcoming)
+
+    stats = commands.add_parser('stats', help="clashing deadlines, load per week and overdue tasks")
+    stats.add_argument('--days', type=int, default=14, help="days ahead to look at (default: %(default)s)")
+    stats.add_argument('--window', type=int, default=CLASH_WINDOW, metavar='MINUTES',
+                       help="deadlines this close count as clashing (default: %(default)s, the same time)")
+    stats.set_defaults(handler=command_stats)
+
+    complete = commands.add_parser('complete', help="mark tasks complete by their number from list "
+                                                    "or their id (for a recurring task, its next occurrence)")
+    complete.add_argument('tasks', nargs='+', metavar='task')
+    complete.set_defaults(handler=command_complete)
+
+    import_ = commands.add_parser('import', help="bulk import tasks (.ics, .csv, JSON list or one per line, - for stdin)")
+    import_.add_argument('files', nargs='+')
+    import_.set_defaults(handler=command_import)
+
+    export = commands.add_parser('export', help="write all tasks out")
+    export.add_argument('output', nargs='?', default='-', metavar='file', help="output file (default: stdout)")
+    export.add_argument('--format', choices=EXPORT_FORMATS,
+                        help="default: ics or csv by the file's extension, otherwise json")
+    export.set_defaults(handler=command_export)
+
+    archive = commands.add_parser('archive', help="move old completed tasks out of the task file")
+    archive.add_argument('--older-than', type=int, default=ARCHIVE_AFTER_DAYS, metavar='DAYS',
+                         help=f"archive tasks dated more than DAYS ago (default: {ARCHIVE_AFTER_DAYS})")
+    archive.set_defaults(handler=command_archive)
+
+    sync = commands.add_parser('sync', help="exchange changes with the sync server")
+    sync.set_defaults(handler=command_sync)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    profiler = Profiler.from_environment()
+    profiler.enabled = profiler.enabled or args.profile
+    storage = open_storage(Task.parse, args.file)
+    profiler.instrument_storage(storage)
+    args.client = None
+    if args.sync:
+        # Changes made by any command are queued as ops and sent by the next sync
+        args.client = SyncClient(args.sync, sync_state_path(args.file))
+        storage = SyncedStorage(storage, args.client)
+    try:
+        return profiler.wrap(f"command.{args.command}", args.handler)(storage, args)
+    finally:
+        storage.flush()
+        if storage.needs_compaction():
+            storage.compact(storage.load())
+        storage.close()
+        if args.client:
+            args.client.close()
+        if profiler.enabled:
+            print(profiler.report(), file=sys.stderr)
+            print(f"Profile written to {profiler.dump()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
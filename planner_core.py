@@ -0,0 +1,991 @@
+from bisect import bisect_left, bisect_right, insort
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from functools import lru_cache, total_ordering
+from heapq import heappush, heappop
+import hashlib
+import itertools
+import re
+import uuid
+
+# Accepted date formats, tried in order ("dd/mm/yy" is what the calendar produces)
+DATE_FORMATS = ("%d/%m/%y", "%d/%m/%Y")
+
+# "dd/mm/yy - Title [Priority]: Description (HH:MM) {remind 15m} {rrule FREQ=WEEKLY} {done 18/01/25}
+# {id 3f9c0a1b2d4e}", optionally followed by " ✓". The reminder (minutes before the deadline),
+# the recurrence rule, the completed occurrences of a recurring task and the id are optional.
+TASK_PATTERN = re.compile(
+    r"^(?P<date>\S+) - (?P<title>.*?) \[(?P<label>[^\]]*)\]: (?P<desc>.*?)"
+    r"(?: \((?P<time>\d{1,2}:\d{2})\))?(?: \{remind (?P<remind>\d+)m\})?"
+    r"(?: \{rrule (?P<rrule>[^}]*)\})?(?: \{done (?P<done>[^}]*)\})?"
+    r"(?: \{id (?P<id>[0-9a-f]+)\})?(?P<check> ✓)?$",
+    re.DOTALL
+)
+
+# The id part of a task text
+ID_SUFFIX = re.compile(r" \{id [0-9a-f]+\}")
+
+# A time of day; TASK_PATTERN takes any "(d:dd)", but only these are deadlines
+TIME_PATTERN = re.compile(r"^([01]?\d|2[0-3]):([0-5]\d)$")
+
+# The reminder, recurrence, completed occurrences and id at the end of a task text, which
+# are left out when the text is shown
+STORED_SUFFIXES = re.compile(r"(?: \{(?:remind|rrule|done|id) [^}]*\})+(?=(?: ✓)?$)")
+
+# Recurrence presets offered in the task dialog and the command line
+REPEAT_PRESETS = {
+    "Daily": "FREQ=DAILY",
+    "Weekly": "FREQ=WEEKLY",
+    "Monthly": "FREQ=MONTHLY",
+    "Yearly": "FREQ=YEARLY",
+}
+
+# How far ahead to look for the next occurrence of a recurring task
+RECURRENCE_HORIZON = timedelta(days=3660)
+
+# Time of the daily "due today/tomorrow" summary notification
+SUMMARY_TIME = (9, 0)
+
+
+@lru_cache(maxsize=4096)
+def parse_task_date(date_str):
+    # Many tasks share a date, so each distinct string is only parsed once
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            pass
+    return None
+
+
+class Recurrence:
+    """A subset of iCalendar RRULE: FREQ=DAILY|WEEKLY|MONTHLY|YEARLY with INTERVAL,
+    BYDAY (weekly only), COUNT and UNTIL (YYYYMMDD or dd/mm/yy).
+    
+    Occurrences are never stored; between() computes the ones inside a date window,
+    jumping straight to it for daily and weekly rules.
+    """
+    __slots__ = ("rule", "freq", "interval", "byday", "count", "until")
+
+    WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.freq, self.interval, self.byday, self.count, self.until = None, 1, None, None, None
+        for part in rule.upper().split(";"):
+            key, _, value = part.strip().partition("=")
+            if key == "FREQ" and value in ("DAILY", "WEEKLY", "MONTHLY", "YEARLY"):
+                self.freq = value
+            elif key == "INTERVAL" and value.isdigit() and int(value) > 0:
+                self.interval = int(value)
+            elif key == "COUNT" and value.isdigit():
+                self.count = int(value)
+            elif key == "BYDAY" and all(day in self.WEEKDAYS for day in value.split(",")):
+                self.byday = sorted(self.WEEKDAYS.index(day) for day in value.split(","))
+            elif key == "UNTIL":
+                self.until = parse_until(value)
+                if self.until is None:
+                    raise ValueError(f"Invalid UNTIL date: {value}")
+            else:
+                raise ValueError(f"Unsupported recurrence rule part: {part}")
+        if self.freq is None:
+            raise ValueError("Recurrence rule needs FREQ=DAILY, WEEKLY, MONTHLY or YEARLY")
+
+    def between(self, start, first, last):
+        # Occurrence dates of a series starting on `start` that fall within [first, last]
+        if self.until and self.until < last:
+            last = self.until
+        if last < start or last < first:
+            return
+        if self.freq == "DAILY":
+            # The window's occurrence indexes follow from the dates; no need to walk them
+            low = max(0, -(-(first - start).days // self.interval))
+            high = (last - start).days // self.interval
+            if self.count is not None:
+                high = min(high, self.count - 1)
+            step = timedelta(days=self.interval)
+            day = start + low * step
+            for _ in range(low, high + 1):
+                yield day
+                day += step
+            return
+        for index, day in self.candidates(start, first):
+            if self.count is not None and index >= self.count:
+                return
+            if day > last:
+                return
+            if day >= first:
+                yield day
+
+    def candidates(self, start, first):
+        # (occurrence index, date) in order, starting near `first` where that's cheap
+        if self.freq == "DAILY":
+            skip = max(0, -(-(first - start).days // self.interval))
+            index = skip
+            while True:
+                yield index, start + timedelta(days=index * self.interval)
+                index += 1
+        elif self.freq == "WEEKLY":
+            weekdays = self.byday or [start.weekday()]
+            week_start = start - timedelta(days=start.weekday())
+            first_week = [day for day in weekdays if day >= start.weekday()]
+            skip = max(0, (first - week_start).days // (7 * self.interval))
+            index = 0 if skip == 0 else len(first_week) + (skip - 1) * len(weekdays)
+            week = skip
+            while True:
+                monday = week_start + timedelta(days=7 * week * self.interval)
+                for weekday in (first_week if week == 0 else weekdays):
+                    yield index, monday + timedelta(days=weekday)
+                    index += 1
+                week += 1
+        else:
+            # Months or years without the start's day (31st, 29th of February) are skipped
+            step = self.interval * (12 if self.freq == "YEARLY" else 1)
+            index, months = 0, 0
+            while True:
+                year, month = divmod(start.month - 1 + months, 12)
+                year += start.year
+                if year > 9999:
+                    return
+                if start.day <= monthrange(year, month + 1)[1]:
+                    yield index, date(year, month + 1, start.day)
+                    index += 1
+                months += step
+
+
+def parse_until(value):
+    try:
+        return datetime.strptime(value, "%Y%m%d").date()
+    except ValueError:
+        return parse_task_date(value)
+
+
+def parse_time(value):
+    # (hour, minute) of an "HH:MM" time of day, or None
+    match = TIME_PATTERN.match(value or "")
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def new_task_id():
+    return uuid.uuid4().hex[:12]
+
+
+def legacy_task_id(text, n=0):
+    # Id for a task saved before tasks had ids: derived from its text, so it stays the same
+    # across restarts until the task is next changed and saved with an explicit id.
+    # `n` tells apart identical texts.
+    data = text if not n else f"{text}#{n}"
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:12]
+
+
+def format_date(day):
+    return day.strftime("%d/%m/%y")
+
+
+class Task:
+    """A planner entry, parsed once from its stored text.
+    
+    A task with a recurrence is a whole series: `date` is its first occurrence and
+    completed occurrences are kept in `done_dates` rather than as copies.
+    
+    `id` is stable for the life of the task. New tasks get a random one; tasks loaded
+    from text without an id get one from TaskStore.
+    """
+    __slots__ = ("id", "date", "date_str", "time", "title", "priority", "description", "status",
+                 "reminder", "recurrence", "done_dates", "text")
+
+    def __init__(self, date_str, title, priority="Medium", description="", time=None,
+                 status="Open", text=None, reminder=None, recurrence=None, done_dates=frozenset(),
+                 task_id=None):
+        self.id = task_id if task_id or text is not None else new_task_id()
+        self.date_str = date_str
+        self.date = parse_task_date(date_str)
+        self.title = title
+        self.priority = priority
+        self.description = description
+        self.time = time
+        self.status = status
+        self.reminder = reminder   # minutes before the deadline, or None
+        self.recurrence = recurrence
+        self.done_dates = done_dates
+        # Display/storage text; kept verbatim for loaded tasks so unchanged entries round-trip
+        self.text = text if text is not None else self.format()
+
+    @classmethod
+    def parse(cls, text):
+        match = TASK_PATTERN.match(text)
+        if not match:
+            # Keep malformed entries as-is so saving never loses them
+            return cls(text.split(" - ")[0], text, text=text)
+        label = match.group("label")
+        status = "Done" if label == "Done" or match.group("check") else "Open"
+        priority = "Medium" if label == "Done" else label
+        reminder = int(match.group("remind")) if match.group("remind") else None
+        recurrence, done_dates = None, frozenset()
+        if match.group("rrule"):
+            try:
+                recurrence = Recurrence(match.group("rrule"))
+            except ValueError:
+                # Shown and saved as-is, just not expanded
+                recurrence = None
+        if match.group("done"):
+            done_dates = frozenset(filter(None, map(parse_task_date, match.group("done").split())))
+        time, description = match.group("time"), match.group("desc")
+        if time and parse_time(time) is None:
+            # Not a time of day (e.g. "25:00"): part of the description, so no deadline
+            time, description = None, f"{description} ({time})"
+        return cls(match.group("date"), match.group("title"), priority,
+                   description, time, status, text, reminder,
+                   recurrence, done_dates, match.group("id"))
+
+    @property
+    def source(self):
+        # The stored task; see Occurrence
+        return self
+
+    @property
+    def label(self):
+        # Completed tasks are shown and stored as [Done] instead of their priority
+        return "Done" if self.status == "Done" else self.priority
+
+    @property
+    def display(self):
+        # The text shown in lists and notifications: the stored text without its {...} parts
+        return STORED_SUFFIXES.sub("", self.text)
+
+    @property
+    def hour_minute(self):
+        if self.time:
+            return tuple(self.time.split(":"))
+        return ("12", "00")
+
+    @property
+    def deadline(self):
+        # Date and time the task is due, or None without both
+        clock = parse_time(self.time)
+        if self.date is None or clock is None:
+            return None
+        return datetime(self.date.year, self.date.month, self.date.day, *clock)
+
+    def occurrences(self, first, last):
+        # Dates within [first, last] on which this task is due
+        if self.date is None:
+            return []
+        if self.recurrence is None:
+            return [self.date] if first <= self.date <= last else []
+        return list(self.recurrence.between(self.date, first, last))
+
+    def occurs_on(self, day):
+        return bool(self.occurrences(day, day))
+
+    def next_open(self, day):
+        # First occurrence on or after `day` that isn't completed yet
+        if self.status == "Done" or self.date is None:
+            return None
+        if self.recurrence is None:
+            return self.date if self.date >= day else None
+        for occurrence in self.recurrence.between(self.date, day, day + RECURRENCE_HORIZON):
+            if occurrence not in self.done_dates:
+                return occurrence
+        return None
+
+    def completion(self, day):
+        # Fields that mark occurrence `day` of this recurring task done. Once its first
+        # occurrences are all done, the series starts at its first open one instead and the
+        # dates before it are dropped, so a daily series doesn't collect a date per day for
+        # ever. A series with a COUNT keeps its start: it counts from there, and its list
+        # can't outgrow the count anyway.
+        done = self.done_dates | {day}
+        if self.recurrence.count is not None:
+            return {"done_dates": done}
+        first_open = next((occurrence for occurrence in
+                           self.recurrence.between(self.date, self.date, self.date + RECURRENCE_HORIZON)
+                           if occurrence not in done), None)
+        if first_open is None or first_open == self.date:
+            return {"done_dates": done}
+        return {"date_str": format_date(first_open),
+                "done_dates": frozenset(done_day for done_day in done if done_day > first_open)}
+
+    def format(self, date_str=None, label=None, series=True):
+        text = f"{date_str or self.date_str} - {self.title} [{label or self.label}]: {self.description}"
+        if self.time:
+            text += f" ({self.time})"
+        if self.reminder:
+            text += f" {{remind {self.reminder}m}}"
+        if series and self.recurrence:
+            text += f" {{rrule {self.recurrence.rule}}}"
+            if self.done_dates:
+                text += " {done " + " ".join(format_date(day) for day in sorted(self.done_dates)) + "}"
+        if series and self.id:
+            text += f" {{id {self.id}}}"
+        return text
+
+    def update(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+        if "date_str" in fields:
+            self.date = parse_task_date(self.date_str)
+        self.text = self.format()
+
+    def restore(self, text):
+        # Take on every field of another text of this task, kept verbatim, e.g. an earlier version
+        other = Task.parse(text)
+        for name in self.__slots__:
+            if name != "id":
+                setattr(self, name, getattr(other, name))
+
+    def __repr__(self):
+        return f"Task({self.text!r})"
+
+
+class Occurrence:
+    """One date of a recurring task, as returned by date range queries.
+    
+    Reads like a Task (other attributes come from `source`); changes go to the source task.
+    """
+    __slots__ = ("source", "date")
+
+    def __init__(self, source, date):
+        self.source = source
+        self.date = date
+
+    def __getattr__(self, name):
+        return getattr(self.source, name)
+
+    @property
+    def date_str(self):
+        return format_date(self.date)
+
+    @property
+    def status(self):
+        if self.source.status == "Done" or self.date in self.source.done_dates:
+            return "Done"
+        return "Open"
+
+    @property
+    def label(self):
+        return "Done" if self.status == "Done" else self.source.priority
+
+    @property
+    def text(self):
+        return self.source.format(self.date_str, self.label, series=False)
+
+    @property
+    def display(self):
+        return STORED_SUFFIXES.sub("", self.text)
+
+    @property
+    def deadline(self):
+        clock = parse_time(self.source.time)
+        if clock is None:
+            return None
+        return datetime(self.date.year, self.date.month, self.date.day, *clock)
+
+    def __repr__(self):
+        return f"Occurrence({self.text!r})"
+
+
+# Below this many tasks scanning every text is quicker than building the search index
+INDEX_MIN_TASKS = 10000
+
+# Field filters accepted in the search box, e.g. "priority:High" or "date:>=01/02/25"
+SEARCH_FIELD_PATTERN = re.compile(r"^(priority|status|title|date):(>=|<=|>|<|=)?(.+)$", re.IGNORECASE)
+
+
+def parse_query(query):
+    # Split a search query into lower-cased free text and a tuple of (field, op, value) filters
+    words, filters = [], []
+    for word in query.split():
+        match = SEARCH_FIELD_PATTERN.match(word)
+        if match:
+            field, op, value = match.groups()
+            filters.append((field.lower(), op or "=", value.lower()))
+        else:
+            words.append(word)
+    return " ".join(words).lower(), tuple(filters)
+
+
+def match_filter(task, field, op, value):
+    if field == "priority":
+        return task.label.lower() == value
+    if field == "status":
+        return task.status.lower() == value
+    if field == "title":
+        return value in task.title.lower()
+    
+    day = parse_task_date(value)
+    if day is None or task.date is None:
+        return False
+    if task.recurrence is not None:
+        # A series matches if any of its occurrences does
+        first, last = {
+            ">=": (day, day + RECURRENCE_HORIZON),
+            ">": (day + timedelta(days=1), day + RECURRENCE_HORIZON),
+            "<=": (task.date, day),
+            "<": (task.date, day - timedelta(days=1)),
+        }.get(op, (day, day))
+        return next(task.recurrence.between(task.date, first, last), None) is not None
+    if op == ">=":
+        return task.date >= day
+    if op == "<=":
+        return task.date <= day
+    if op == ">":
+        return task.date > day
+    if op == "<":
+        return task.date < day
+    return task.date == day
+
+
+class SearchIndex:
+    """Trigram index over lower-cased task text.
+
+    Small stores are simply scanned. The index is only kept once start() is called (the
+    GUI does so while loading a large file, so it's built a chunk at a time as tasks are
+    merged); tasks already in the store then are indexed by build(), and until that's
+    done searches keep scanning.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._text = None    # task -> lower-cased text, for indexed tasks; None: no index
+        self._grams = None   # trigram -> tasks whose text contains it
+        self._pending = []   # tasks in the store when indexing started, not indexed yet
+        self._last = None    # (text, filters, results) of the previous search
+
+    @staticmethod
+    def _trigrams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def start(self):
+        if self._text is None:
+            self._text, self._grams = {}, {}
+            self._pending = list(self.store)
+
+    def build(self, limit=None):
+        # Index up to `limit` of the pending tasks (default: all); True once the index is complete
+        self.start()
+        while self._pending and (limit is None or limit > 0):
+            task = self._pending.pop()
+            # Skip tasks removed since, or indexed already by add()
+            if task not in self._text and self.store.get(task.id) is task:
+                self._add(task)
+            if limit is not None:
+                limit -= 1
+        return not self._pending
+
+    def ready(self):
+        return self._text is not None and not self._pending
+
+    def _add(self, task):
+        text = self._text[task] = task.display.lower()
+        for gram in self._trigrams(text):
+            self._grams.setdefault(gram, set()).add(task)
+
+    def add(self, task):
+        self._last = None
+        if self._text is not None:
+            self._add(task)
+
+    def remove(self, task):
+        self._last = None
+        if self._text is None or task not in self._text:
+            return
+        for gram in self._trigrams(self._text.pop(task)):
+            tasks = self._grams[gram]
+            tasks.discard(task)
+            if not tasks:
+                del self._grams[gram]
+
+    def update(self, task):
+        self.remove(task)
+        self.add(task)
+
+    def invalidate(self):
+        # Store order changed, so previous results can't be narrowed any more
+        self._last = None
+
+    def search(self, query):
+        text, filters = parse_query(query)
+        if not text and not filters:
+            self._last = None
+            return list(self.store)
+        indexed = self.ready()
+        
+        last = self._last
+        if last and last[1] == filters and text.startswith(last[0]):
+            # The query only got longer, so the answer is a subset of the previous one
+            candidates = last[2]
+        elif indexed and len(text) >= 3:
+            # Only tasks containing every trigram of the text can match
+            grams = sorted((self._grams.get(gram, ()) for gram in self._trigrams(text)), key=len)
+            candidates = self.store.ordered(set(grams[0]).intersection(*grams[1:]))
+        else:
+            candidates = self.store
+        
+        lowered = self._text.__getitem__ if indexed else (lambda task: task.display.lower())
+        results = [task for task in candidates
+                   if text in lowered(task) and all(match_filter(task, *f) for f in filters)]
+        self._last = (text, filters, results)
+        return results
+
+
+# Open-task priorities from weakest to strongest, used for per-day calendar colours
+PRIORITY_RANK = {"Low": 1, "Medium": 2, "High": 3}
+
+
+@total_ordering
+class Descending:
+    """Sort key wrapper that reverses the order of a value that can't be negated."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class SortOrder:
+    """A multi-key task order such as "date, time" or "-priority, title".
+    
+    Fields are date, time, priority (High first), status (Open first) and title;
+    a leading "-" reverses one. key(task) builds the task's whole sort key in one go,
+    so callers can compute it once and keep it.
+    """
+
+    # name -> (extractor, whether its values are numbers that can simply be negated)
+    FIELDS = {
+        "date": (lambda task: task.date or date.max, False),
+        "time": (lambda task: int(task.time[:-3]) * 60 + int(task.time[-2:]) if task.time else 24 * 60, True),
+        "priority": (lambda task: -PRIORITY_RANK.get(task.priority, 0), True),
+        "status": (lambda task: task.status == "Done", True),
+        "title": (lambda task: task.title.casefold(), False),
+    }
+
+    def __init__(self, spec):
+        self.fields = []    # (name, descending)
+        for part in spec.replace(" ", "").split(","):
+            name = part.lstrip("-").lower()
+            if name not in self.FIELDS:
+                raise ValueError(f"Unknown sort field: {part or '(empty)'} "
+                                 f"(use {', '.join(self.FIELDS)})")
+            self.fields.append((name, part.startswith("-")))
+        self.spec = ", ".join(("-" if descending else "") + name for name, descending in self.fields)
+        
+        # key(task) is built once here rather than interpreting the fields for every task
+        extractors = []
+        for name, descending in self.fields:
+            extract, numeric = self.FIELDS[name]
+            if descending and numeric:
+                extract = (lambda f: lambda task: -f(task))(extract)
+            elif descending:
+                extract = (lambda f: lambda task: Descending(f(task)))(extract)
+            extractors.append(extract)
+        if len(extractors) == 1:
+            # Keys are only ever compared with keys of the same order, so one field needs no tuple
+            self.key = extractors[0]
+        else:
+            self.key = lambda task: tuple([extract(task) for extract in extractors])
+
+    def __eq__(self, other):
+        return isinstance(other, SortOrder) and self.spec == other.spec
+
+    def __repr__(self):
+        return f"SortOrder({self.spec!r})"
+
+
+# Order used until one is chosen
+DEFAULT_SORT = "date"
+
+
+class TaskStore:
+    """Ordered task collection keyed by task id, with a per-day index for date range queries.
+    
+    Lookup, update and removal by id are O(1) apart from the small per-day bucket.
+    With a SortOrder the store is kept in that order: each task's key is computed once
+    and kept, and single adds and edits are placed by bisection. Recurring tasks are
+    kept out of the day index and expanded into Occurrences only for the range being
+    queried. Changes made through add/remove/update are also recorded in `storage`,
+    if set.
+    """
+
+    def __init__(self, tasks=(), storage=None, order=None):
+        self.storage = storage
+        self.order = order   # SortOrder, or None to keep tasks in the order they were added
+        self._by_id = {}     # task id -> task
+        self._rows = []      # (sort key, seq, task) in store order
+        self._order = {}     # task -> (sort key, seq), i.e. its row without the task
+        self._next_position = 0
+        self._by_date = {}   # date -> tasks due that day, in store order
+        self._dates = []     # sorted dates that have at least one task
+        self._recurring = [] # tasks with a recurrence rule
+        self._months = {}    # (year, month) -> {date: summary} of its dated tasks, built on demand
+        self._merged = {}    # (year, month) -> the same with recurring tasks' occurrences added
+        self.text_index = SearchIndex(self)
+        self.extend(tasks)
+
+    def __iter__(self):
+        return (row[2] for row in self._rows)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def get(self, task_id):
+        return self._by_id.get(task_id)
+
+    def _index(self, task):
+        if task.date is None:
+            return
+        if task.recurrence is not None:
+            self._recurring.append(task)
+            self._merged.clear()
+            return
+        self._forget_month(task.date)
+        bucket = self._by_date.get(task.date)
+        if bucket is None:
+            bucket = self._by_date[task.date] = []
+            insort(self._dates, task.date)
+        bucket.append(task)
+
+    def _unindex(self, task):
+        if task.recurrence is not None:
+            if task in self._recurring:
+                self._recurring.remove(task)
+                self._merged.clear()
+            return
+        bucket = self._by_date.get(task.date)
+        if bucket is None:
+            return
+        self._forget_month(task.date)
+        bucket.remove(task)
+        if not bucket:
+            del self._by_date[task.date]
+            del self._dates[bisect_left(self._dates, task.date)]
+
+    def _forget_month(self, day):
+        self._months.pop((day.year, day.month), None)
+        self._merged.pop((day.year, day.month), None)
+
+    def extend(self, tasks):
+        # Bulk insert of already-stored tasks (not recorded in storage). Files are saved in
+        # store order, so rows normally arrive sorted; only if not is one sort needed.
+        start = len(self._rows)
+        for task in tasks:
+            self._insert(task, append=True)
+        rows = self._rows
+        if any(rows[i] > rows[i + 1] for i in range(max(start - 1, 0), len(rows) - 1)):
+            rows.sort()
+            self.text_index.invalidate()
+
+    def _insert(self, task, append=False):
+        if task.id is None or task.id in self._by_id:
+            # Saved before ids existed, or a duplicate (e.g. the same file imported twice)
+            n = 0
+            while legacy_task_id(task.text, n) in self._by_id:
+                n += 1
+            task.id = legacy_task_id(task.text, n)
+        self._by_id[task.id] = task
+        self._place(task, append)
+        self._index(task)
+        self.text_index.add(task)
+
+    def _place(self, task, append=False):
+        place = (self.order.key(task) if self.order else (), self._next_position)
+        self._next_position += 1
+        self._order[task] = place
+        if append or not self._rows or self._rows[-1] < place:
+            self._rows.append(place + (task,))
+        else:
+            insort(self._rows, place + (task,))
+
+    def _unplace(self, task):
+        # (key, seq) sorts just before the row (key, seq, task), so bisection lands on it
+        del self._rows[bisect_left(self._rows, self._order.pop(task))]
+
+    def add(self, task):
+        self._insert(task)
+        if self.storage:
+            self.storage.add(task.text)
+
+    def remove(self, task):
+        del self._by_id[task.id]
+        self._unplace(task)
+        self._unindex(task)
+        self.text_index.remove(task)
+        if self.storage:
+            self.storage.remove(task.text)
+
+    def update(self, task, **fields):
+        # Only a date or recurrence change needs to move the task in the date index
+        self._change(task, lambda: task.update(**fields), "date_str" in fields or "recurrence" in fields)
+
+    def restore(self, task, text):
+        # Put a task back to another text of itself (same id), e.g. when undoing an edit
+        self._change(task, lambda: task.restore(text), True)
+
+    def _change(self, task, change, reindex):
+        old_text = task.text
+        if reindex:
+            self._unindex(task)
+            change()
+            self._index(task)
+        else:
+            change()
+            if task.recurrence is not None:
+                # Any of its occurrences' days may have changed
+                self._merged.clear()
+            elif task.date is not None:
+                # Its day's summary may have changed
+                self._forget_month(task.date)
+        if self.order and self.order.key(task) != self._order[task][0]:
+            # Move just this task to its new place
+            self._unplace(task)
+            self._place(task)
+        self.text_index.update(task)
+        if self.storage:
+            self.storage.update(old_text, task.text)
+
+    def complete(self, task, day=None):
+        # Mark a task done and return the date completed. For a recurring task only its
+        # first open occurrence on or after `day` is completed, recorded as an exception.
+        if task.recurrence is None:
+            if task.status != "Done":
+                self.update(task, status="Done")
+            return task.date
+        occurrence = task.next_open(day or datetime.now().date())
+        if occurrence is not None:
+            self.update(task, **task.completion(occurrence))
+        return occurrence
+
+    def sort(self, order):
+        # Keep the store in `order` from now on; ties keep their current order
+        self.order = order
+        keys = {task: order.key(task) for task in self}
+        tasks = sorted(keys, key=keys.__getitem__)
+        self._rows = [(keys[task], seq, task) for seq, task in enumerate(tasks)]
+        self._order = {task: (key, seq) for key, seq, task in self._rows}
+        self._next_position = len(self._rows)
+        for bucket in self._by_date.values():
+            bucket.sort(key=self._order.__getitem__)
+        self.text_index.invalidate()
+
+    def position(self, task):
+        # Comparable place of a task in store order, e.g. for bisecting a projection of it
+        return self._order[task]
+
+    def search(self, query):
+        return self.text_index.search(query)
+
+    def ordered(self, tasks):
+        # Put an arbitrary subset of the store back into store order
+        return sorted(tasks, key=self._order.__getitem__)
+
+    def dates(self):
+        # Dates of the stored (non-recurring) tasks
+        return list(self._dates)
+
+    def recurring_dates(self, start, end):
+        # Dates within [start, end] on which some recurring task occurs
+        dates = set()
+        for task in self._recurring:
+            dates.update(task.occurrences(start, end))
+        return dates
+
+    def summary(self, day):
+        # See day_summary; None if the day has no tasks
+        return self.month_summary(day.year, day.month).get(day)
+
+    def month_summary(self, year, month):
+        # {date: summary} for every day of a month that has tasks. Kept per month until a
+        # task of that month changes; recurring tasks' occurrences are merged in on top of the
+        # dated tasks' part, so a change to a recurring task only has them merged again.
+        merged = self._merged.get((year, month))
+        if merged is not None:
+            return merged
+        first, last = date(year, month, 1), date(year, month, monthrange(year, month)[1])
+        table = self._months.get((year, month))
+        if table is None:
+            days = self._dates[bisect_left(self._dates, first):bisect_right(self._dates, last)]
+            table = self._months[(year, month)] = {day: day_summary(self._by_date[day]) for day in days}
+        # An occurrence summarises as its series does unless completed on its own, so there
+        # are only a few distinct summaries per day: they're counted, then merged once each
+        occurrences = {}    # date -> {summary of one occurrence: how many that day}
+        done = (None, 0, 1, (0, 0, 0))
+        for task in self._recurring:
+            days = task.occurrences(first, last)
+            if not days:
+                continue
+            series = day_summary([task])
+            for day in days:
+                item = done if day in task.done_dates else series
+                counts = occurrences.setdefault(day, {})
+                counts[item] = counts.get(item, 0) + 1
+        merged = dict(table) if occurrences else table
+        for day, counts in occurrences.items():
+            summary = table.get(day)
+            for (strongest, open_count, done_count, by_priority), n in counts.items():
+                summary = merge_summaries(summary, (strongest, open_count * n, done_count * n,
+                                                    tuple(count * n for count in by_priority)))
+            merged[day] = summary
+        self._merged[(year, month)] = merged
+        return merged
+
+    def on(self, day, open_only=False):
+        return self.between(day, day, open_only)
+
+    def between(self, start, end, open_only=False, recurring=True):
+        # Walk only the day buckets within [start, end], plus recurring tasks expanded for the
+        # range unless `recurring` is False
+        tasks = []
+        i = bisect_left(self._dates, start)
+        while i < len(self._dates) and self._dates[i] <= end:
+            for task in self._by_date[self._dates[i]]:
+                if not open_only or task.status != "Done":
+                    tasks.append(task)
+            i += 1
+        
+        if not recurring:
+            return tasks
+        occurrences = [Occurrence(task, day) for task in self._recurring
+                       for day in task.occurrences(start, end)]
+        if occurrences:
+            tasks.extend(item for item in occurrences if not open_only or item.status != "Done")
+            tasks.sort(key=sort_key)
+        return tasks
+
+    def upcoming(self, days=7, today=None):
+        today = today or datetime.now().date()
+        return [(task.date, task) for task in self.between(today, today + timedelta(days=days), True)]
+
+
+class NotificationScheduler:
+    """Min-heap of upcoming notifications: task deadlines, reminders before them and other timed events.
+    
+    Rescheduling a task just pushes fresh entries; the previous ones are recognised as
+    stale by their version number and dropped when they reach the top of the heap.
+    """
+
+    def __init__(self):
+        self.heap = []          # (when, seq, kind, task or occurrence, version)
+        self.versions = {}      # task -> version of its current entries
+        self.counter = itertools.count()
+
+    def schedule(self, task, now=None):
+        # (Re)schedule a task's "due" and "reminder" notifications from its current fields.
+        # A recurring task only has its next open occurrence scheduled at a time.
+        now = now or datetime.now()
+        version = self.versions.get(task, 0) + 1
+        self.versions[task] = version
+        if task.status == "Done":
+            return
+        item = task
+        if task.recurrence is not None:
+            day = task.next_open(now.date())
+            while day is not None and Occurrence(task, day).deadline and Occurrence(task, day).deadline <= now:
+                day = task.next_open(day + timedelta(days=1))
+            if day is None:
+                return
+            item = Occurrence(task, day)
+        deadline = item.deadline
+        if deadline is None:
+            return
+        
+        events = [(deadline, "due")]
+        if task.reminder:
+            events.append((deadline - timedelta(minutes=task.reminder), "reminder"))
+        for when, kind in events:
+            if when > now:
+                heappush(self.heap, (when, next(self.counter), kind, item, version))
+
+    def unschedule(self, task):
+        self.versions.pop(task, None)
+
+    def add(self, when, kind):
+        # A notification not tied to a task
+        heappush(self.heap, (when, next(self.counter), kind, None, None))
+
+    def is_current(self, entry):
+        item, version = entry[3], entry[4]
+        return item is None or self.versions.get(item.source) == version
+
+    def next_time(self):
+        while self.heap and not self.is_current(self.heap[0]):
+            heappop(self.heap)
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now=None):
+        # (when, kind, task) of every current entry due by `now`
+        now = now or datetime.now()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            entry = heappop(self.heap)
+            if self.is_current(entry):
+                due.append((entry[0], entry[2], entry[3]))
+                if entry[2] == "due" and entry[3].recurrence is not None:
+                    # Move on to the series' next occurrence
+                    self.schedule(entry[3].source, entry[0])
+        return due
+
+
+def day_summary(tasks):
+    # (strongest open priority, open count, done count, open (High, Medium, Low) counts) of one
+    # day's tasks, or None if there are none
+    strongest, open_count, done_count = None, 0, 0
+    by_priority = [0, 0, 0]
+    for task in tasks:
+        if task.status == "Done":
+            done_count += 1
+            continue
+        open_count += 1
+        rank = PRIORITY_RANK.get(task.priority, 2)
+        by_priority[3 - rank] += 1
+        if strongest is None or rank > PRIORITY_RANK.get(strongest, 2):
+            strongest = task.priority
+    if not open_count and not done_count:
+        return None
+    return (strongest, open_count, done_count, tuple(by_priority))
+
+
+def merge_summaries(first, second):
+    # day_summary of two groups of tasks from the summaries of each (either may be None)
+    if first is None or second is None:
+        return first or second
+    strongest = first[0]
+    if strongest is None or (second[0] is not None and
+                             PRIORITY_RANK.get(second[0], 2) > PRIORITY_RANK.get(strongest, 2)):
+        strongest = second[0]
+    by_priority = tuple(a + b for a, b in zip(first[3], second[3]))
+    return (strongest, first[1] + second[1], first[2] + second[2], by_priority)
+
+
+def month_window(displayed, span):
+    # (year, month) of a calendar's displayed month and `span` months either side of it.
+    # `displayed` is as tkcalendar's get_displayed_month() gives it: (month, year).
+    month, year = displayed
+    middle = year * 12 + month - 1
+    return [(index // 12, index % 12 + 1) for index in range(middle - span, middle + span + 1)]
+
+
+def sort_key(task):
+    # Date order; tasks with invalid dates go last
+    return task.date or datetime.max.date()
+
+
+def summary_messages(store, today=None):
+    # Lines of the "due today/tomorrow" summary notification
+    today = today or datetime.now().date()
+    messages = []
+    
+    # Check for tasks due today
+    today_tasks = store.on(today, open_only=True)
+    if today_tasks:
+        messages.append(f"You have {len(today_tasks)} task(s) due today!")
+    
+    # Check for tasks due tomorrow
+    tomorrow_tasks = store.on(today + timedelta(days=1), open_only=True)
+    if tomorrow_tasks:
+        messages.append(f"You have {len(tomorrow_tasks)} task(s) due tomorrow!")
+    return messages
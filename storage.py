@@ -0,0 +1,387 @@
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+
+
+class BackgroundWriter:
+    """Queue of pending writes drained in batches by a daemon thread.
+    
+    Subclasses implement write_batch(batch), where batch is a list of
+    (kind, payload) items in the order they were queued.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.writer = threading.Thread(target=self.run_writer, daemon=True)
+        self.writer.start()
+
+    def flush(self):
+        # Block until everything queued so far is on disk
+        self.queue.join()
+
+    def close(self):
+        self.flush()
+        self.queue.put(('stop', None))
+        self.writer.join()
+
+    def run_writer(self):
+        while True:
+            batch = [self.queue.get()]
+            # Take everything else that's already waiting so it's written in one go
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                print(f"Error saving tasks: {e}")
+            for _ in batch:
+                self.queue.task_done()
+            if any(kind == 'stop' for kind, _ in batch):
+                return
+
+    def write_batch(self, batch):
+        raise NotImplementedError
+
+
+class JournalStorage(BackgroundWriter):
+    """tasks.json snapshot plus an append-only journal of the changes made since.
+
+    Mutations are queued and written in batches by a background thread, so the
+    caller never blocks on disk I/O. The journal starts with the hash of the
+    snapshot it applies to; a journal left behind by an interrupted compaction
+    no longer matches the new snapshot and is ignored on load.
+    """
+
+    def __init__(self, path='tasks.json', compact_after=500):
+        self.path = path
+        self.journal_path = os.path.splitext(path)[0] + '.journal'
+        self.compact_after = compact_after
+        self.pending = 0         # journal entries since the last compaction
+        self.base = None         # hash of the snapshot the journal applies to
+        self.base_known = False  # base is only read from disk once it's needed
+        super().__init__()
+
+    @staticmethod
+    def snapshot_hash(data):
+        return hashlib.sha1(data).hexdigest() if data is not None else None
+
+    def load_snapshot(self):
+        # (texts, hash) of the current snapshot file
+        data = None
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        return (json.loads(data) if data else []), self.snapshot_hash(data)
+
+    def load(self):
+        # Latest snapshot with the journal replayed on top
+        tasks, self.base = self.load_snapshot()
+        self.base_known = True
+
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+            if lines and self.read_entry(lines[0]).get('base') == self.base:
+                for line in lines[1:]:
+                    entry = self.read_entry(line)
+                    if entry:
+                        self.apply(tasks, entry)
+                        self.pending += 1
+            else:
+                # Left over from before the current snapshot; start a fresh journal
+                os.remove(self.journal_path)
+        return tasks
+
+    @staticmethod
+    def read_entry(line):
+        try:
+            return json.loads(line)
+        except ValueError:
+            # A crash mid-append can leave a truncated last line
+            return {}
+
+    @staticmethod
+    def apply(tasks, entry):
+        op = entry.get('op')
+        if op == 'add':
+            tasks.append(entry['text'])
+        elif op == 'remove' and entry['text'] in tasks:
+            tasks.remove(entry['text'])
+        elif op == 'update' and entry['old'] in tasks:
+            tasks[tasks.index(entry['old'])] = entry['new']
+
+    def add(self, text):
+        self.record({'op': 'add', 'text': text})
+
+    def remove(self, text):
+        self.record({'op': 'remove', 'text': text})
+
+    def update(self, old, new):
+        if old != new:
+            self.record({'op': 'update', 'old': old, 'new': new})
+
+    def add_many(self, texts):
+        # Bulk insert: `texts` (any iterable, consumed on the writer thread) is streamed
+        # into the journal with a single write/fsync
+        self.queue.put(('bulk', texts))
+
+    def record(self, entry):
+        self.pending += 1
+        self.queue.put(('entry', entry))
+
+    def needs_compaction(self):
+        return self.pending >= self.compact_after
+
+    def compact(self, tasks):
+        # Write `tasks` as the new snapshot; everything journaled so far is folded into it
+        self.pending = 0
+        self.queue.put(('snapshot', list(tasks)))
+
+    def write_batch(self, batch):
+        # A snapshot supersedes every entry queued before it
+        snapshots = [i for i, (kind, _) in enumerate(batch) if kind == 'snapshot']
+        if snapshots:
+            self.write_snapshot(batch[snapshots[-1]][1])
+            batch = batch[snapshots[-1] + 1:]
+
+        # Runs of single entries are coalesced; bulk inserts are kept in place between them
+        segments = []
+        for kind, payload in batch:
+            if kind == 'entry':
+                if not segments or segments[-1][0] != 'entries':
+                    segments.append(('entries', []))
+                segments[-1][1].append(payload)
+            elif kind == 'bulk':
+                segments.append(('bulk', payload))
+        if not segments:
+            return
+
+        if not self.journal_is_current():
+            self.start_journal()
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            for kind, payload in segments:
+                if kind == 'entries':
+                    for entry in self.coalesce(payload):
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                    continue
+                # A bulk insert, written as it's read
+                for text in payload:
+                    f.write(json.dumps({'op': 'add', 'text': text}, ensure_ascii=False) + "\n")
+                    self.pending += 1
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def coalesce(entries):
+        # Fold follow-up changes to a text into the entry that produced it
+        # (add+update -> add, update+update -> update, add+remove -> nothing)
+        result = []
+        for entry in entries:
+            target = entry['old'] if entry['op'] == 'update' else entry['text']
+            producer = None
+            if entry['op'] != 'add':
+                for i in range(len(result) - 1, -1, -1):
+                    produced = result[i].get('new', result[i].get('text'))
+                    if result[i]['op'] != 'remove' and produced == target:
+                        producer = i
+                        break
+            if producer is None:
+                result.append(entry)
+                continue
+
+            previous = result[producer]
+            if entry['op'] == 'update':
+                if previous['op'] == 'add':
+                    result[producer] = {'op': 'add', 'text': entry['new']}
+                else:
+                    result[producer] = {'op': 'update', 'old': previous['old'], 'new': entry['new']}
+            elif previous['op'] == 'add':
+                del result[producer]
+            else:
+                result[producer] = {'op': 'remove', 'text': previous['old']}
+        return result
+
+    def write_snapshot(self, tasks):
+        # Write to a temporary file and rename it over the snapshot, so a crash
+        # leaves either the old or the new file, never a partial one
+        data = json.dumps(tasks).encode('utf-8')
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+        self.base = self.snapshot_hash(data)
+        self.base_known = True
+        self.start_journal()
+
+    def journal_is_current(self):
+        # Whether the journal on disk belongs to the current snapshot. Changes can be
+        # recorded without load() being called first (e.g. from the command line).
+        if not self.base_known:
+            _, self.base = self.load_snapshot()
+            self.base_known = True
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                return self.read_entry(f.readline()).get('base') == self.base
+        except FileNotFoundError:
+            return False
+
+    def start_journal(self):
+        # Empty journal for the snapshot just written
+        with open(self.journal_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'base': self.base}) + "\n")
+
+
+class SqliteStorage(BackgroundWriter):
+    """Tasks in an SQLite database (WAL mode), one row per task with a column per field.
+    
+    Offers the same load/add/remove/update/compact interface as JournalStorage. `parse`
+    turns a task's text into an object with date, time, title, priority, description
+    and status attributes, which fill the columns so the database can be queried
+    directly, e.g. with the sqlite3 shell.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            position INTEGER NOT NULL,
+            day INTEGER,
+            time TEXT,
+            title TEXT,
+            priority TEXT,
+            status TEXT,
+            description TEXT,
+            text TEXT NOT NULL
+        );
+        -- load() reads in position order and adds go after the highest position;
+        -- removes and updates find their row by text
+        CREATE INDEX IF NOT EXISTS tasks_position ON tasks (position);
+        CREATE INDEX IF NOT EXISTS tasks_text ON tasks (text);
+        -- No query filters on these; earlier databases have them
+        DROP INDEX IF EXISTS tasks_day;
+        DROP INDEX IF EXISTS tasks_priority;
+        DROP INDEX IF EXISTS tasks_status;
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    """
+
+    def __init__(self, path='tasks.db', parse=None):
+        self.path = path
+        self.parse = parse
+        self.db = self.connect()
+        self.db.executescript(self.SCHEMA)
+        super().__init__()
+
+    def connect(self):
+        # Connections may be used from the loader thread as well as the main thread
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def row(self, text, position):
+        task = self.parse(text)
+        day = task.date.toordinal() if task.date else None
+        return (position, day, task.time, task.title, task.priority, task.status, task.description, text)
+
+    def load(self):
+        return [text for (text,) in self.db.execute("SELECT text FROM tasks ORDER BY position, id")]
+
+    def import_json(self, json_path='tasks.json'):
+        # One-time import of a tasks.json file with its journal replayed, so changes not yet
+        # compacted (or only journaled so far) come along; does nothing once the database has tasks
+        if self.db.execute("SELECT 1 FROM tasks LIMIT 1").fetchone():
+            return 0
+        source = JournalStorage(json_path)
+        try:
+            tasks = source.load()
+        finally:
+            source.close()
+        if not tasks:
+            return 0
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO tasks (position, day, time, title, priority, status, description, text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.row(text, position) for position, text in enumerate(tasks)))
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('imported_from', ?)", (json_path,))
+        return len(tasks)
+
+    # Mutations are queued and applied by the writer thread on its own connection
+
+    def add(self, text):
+        self.queue.put(('add', text))
+
+    def remove(self, text):
+        self.queue.put(('remove', text))
+
+    def update(self, old, new):
+        if old != new:
+            self.queue.put(('update', (old, new)))
+
+    def add_many(self, texts):
+        # Bulk insert: `texts` (any iterable, consumed on the writer thread) goes in one transaction
+        self.queue.put(('bulk', texts))
+
+    def needs_compaction(self):
+        # Every change is stored in place, there's no journal to fold
+        return False
+
+    def compact(self, tasks):
+        # Rewrite the table with `tasks` in this order
+        self.queue.put(('snapshot', list(tasks)))
+
+    def write_batch(self, batch):
+        if not hasattr(self, 'writer_db'):
+            self.writer_db = self.connect()
+        db = self.writer_db
+        # The whole batch is one transaction
+        with db:
+            for kind, payload in batch:
+                if kind == 'add':
+                    position = db.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM tasks").fetchone()[0]
+                    db.execute(
+                        "INSERT INTO tasks (position, day, time, title, priority, status, description, text) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self.row(payload, position))
+                elif kind == 'remove':
+                    db.execute("DELETE FROM tasks WHERE id = (SELECT id FROM tasks WHERE text = ? LIMIT 1)",
+                               (payload,))
+                elif kind == 'update':
+                    old, new = payload
+                    found = db.execute("SELECT id, position FROM tasks WHERE text = ? LIMIT 1", (old,)).fetchone()
+                    if found:
+                        db.execute(
+                            "UPDATE tasks SET position = ?, day = ?, time = ?, title = ?, priority = ?, "
+                            "status = ?, description = ?, text = ? WHERE id = ?",
+                            self.row(new, found[1]) + (found[0],))
+                elif kind == 'bulk':
+                    start = db.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM tasks").fetchone()[0]
+                    db.executemany(
+                        "INSERT INTO tasks (position, day, time, title, priority, status, description, text) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (self.row(text, position) for position, text in enumerate(payload, start)))
+                elif kind == 'snapshot':
+                    db.execute("DELETE FROM tasks")
+                    db.executemany(
+                        "INSERT INTO tasks (position, day, time, title, priority, status, description, text) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (self.row(text, position) for position, text in enumerate(payload)))
+
+
+def open_storage(parse, path='tasks.json'):
+    # The SQLite backend is opt-in: used when PLANNER_STORAGE is set to "sqlite", or when
+    # its file already exists. The first time, the existing tasks.json is imported.
+    backend = os.environ.get('PLANNER_STORAGE')
+    db_path = os.path.splitext(path)[0] + '.db'
+    if backend == 'sqlite' or (backend is None and os.path.exists(db_path)):
+        storage = SqliteStorage(db_path, parse)
+        storage.import_json(path)
+        return storage
+    return JournalStorage(path)
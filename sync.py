@@ -0,0 +1,471 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from bisect import bisect_right
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from planner_core import Task
+from storage import open_storage
+
+# Seconds between sync rounds of a connected client
+SYNC_INTERVAL = 5.0
+
+# Seconds to wait for the server before treating a round as offline
+SYNC_TIMEOUT = 10.0
+
+# Protocol
+#   Every task has an id, and every change to a task is an op replacing its text:
+#     {"origin": client id, "counter": n, "clock": lamport time, "id": task id, "text": text or null}
+#   ("origin", "counter") numbers each client's ops 1, 2, 3...; a null text deletes the task.
+#   Concurrent changes to the same task are resolved per id: the op with the highest
+#   (clock, origin) wins, on the server and on every client alike, so all replicas converge.
+#   A version vector {origin: highest counter seen} says which ops a replica already has.
+#
+#   POST /push {"ops": [...]}        -> {"vector": server vector}
+#   POST /pull {"vector": {...}}     -> {"ops": ops the vector doesn't cover, "vector": ...}
+
+
+class Replica:
+    """Last-writer-wins map of task id -> (clock, origin, text), with the version vector
+    of the ops applied to it. Deleted tasks are kept with a None text so an older,
+    late-arriving op can't bring them back."""
+
+    def __init__(self, tasks=None, vector=None):
+        self.tasks = tasks or {}
+        self.vector = vector or {}
+        self.clock = max((entry[0] for entry in self.tasks.values()), default=0)
+        self.by_text = {}   # live text -> set of ids
+        for task_id, (_, _, text) in self.tasks.items():
+            if text is not None:
+                self.by_text.setdefault(text, set()).add(task_id)
+
+    def texts(self):
+        return [entry[2] for entry in self.tasks.values() if entry[2] is not None]
+
+    def id_for(self, text):
+        ids = self.by_text.get(text)
+        return next(iter(ids)) if ids else None
+
+    def receive(self, op):
+        # Apply an op once. Returns (accepted, change): accepted is False for an op already
+        # seen; change is the (old text, new text) it made, or None if it lost to a newer op.
+        origin, counter = op["origin"], op["counter"]
+        if counter <= self.vector.get(origin, 0):
+            return False, None
+        self.vector[origin] = counter
+        self.clock = max(self.clock, op["clock"])
+
+        current = self.tasks.get(op["id"])
+        if current and (current[0], current[1]) >= (op["clock"], origin):
+            return True, None
+        old = current[2] if current else None
+        self.set(op["id"], op["clock"], origin, op["text"])
+        return True, ((old, op["text"]) if old != op["text"] else None)
+
+    def set(self, task_id, clock, origin, text):
+        current = self.tasks.get(task_id)
+        if current and current[2] is not None:
+            ids = self.by_text[current[2]]
+            ids.discard(task_id)
+            if not ids:
+                del self.by_text[current[2]]
+        self.tasks[task_id] = (clock, origin, text)
+        if text is not None:
+            self.by_text.setdefault(text, set()).add(task_id)
+
+
+class SyncServer:
+    """Merged task list shared by sync clients.
+
+    The merged tasks are kept with the normal storage engine (so `path` is an ordinary
+    task file the planner can open), and every accepted op is appended to `<path>.ops`,
+    which is replayed on start and used to answer pulls. Tasks already in `path` when
+    the server first starts are published as ops of a "seed" origin.
+    """
+
+    def __init__(self, path='shared.json'):
+        self.log_path = os.path.splitext(path)[0] + '.ops'
+        self.replica = Replica()
+        self.log = {}       # origin -> its ops in counter order
+        self.lock = threading.Lock()
+        self.storage = open_storage(Task.parse, path)
+        texts = self.storage.load()
+
+        if not os.path.exists(self.log_path):
+            with open(self.log_path, 'w', encoding='utf-8') as f:
+                for counter, text in enumerate(texts, 1):
+                    f.write(json.dumps({"origin": "seed", "counter": counter, "clock": 1,
+                                        "id": uuid.uuid4().hex, "text": text}) + "\n")
+
+        with open(self.log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    continue    # a crash mid-append can leave a truncated last line
+                if self.replica.receive(op)[0]:
+                    self.log.setdefault(op["origin"], []).append(op)
+
+        self.storage.compact(self.replica.texts())
+        self.log_file = open(self.log_path, 'a', encoding='utf-8')
+
+    def push(self, ops):
+        with self.lock:
+            accepted = []
+            for op in ops:
+                ok, change = self.replica.receive(op)
+                if not ok:
+                    continue    # resent after a lost response
+                accepted.append(op)
+                self.log.setdefault(op["origin"], []).append(op)
+                if change:
+                    old, new = change
+                    if old is None:
+                        self.storage.add(new)
+                    elif new is None:
+                        self.storage.remove(old)
+                    else:
+                        self.storage.update(old, new)
+            if accepted:
+                self.log_file.write("".join(json.dumps(op) + "\n" for op in accepted))
+                self.log_file.flush()
+                os.fsync(self.log_file.fileno())
+            if self.storage.needs_compaction():
+                self.storage.flush()
+                self.storage.compact(self.replica.texts())
+            return {"vector": dict(self.replica.vector)}
+
+    def pull(self, vector):
+        # Each origin's ops are in counter order, so the delta is a suffix found by bisection
+        with self.lock:
+            ops = []
+            for origin, log in self.log.items():
+                start = bisect_right(log, vector.get(origin, 0), key=lambda op: op["counter"])
+                ops.extend(log[start:])
+            return {"ops": ops, "vector": dict(self.replica.vector)}
+
+    def close(self):
+        self.log_file.close()
+        self.storage.close()
+
+
+class SyncRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if self.path == '/push':
+                response = self.server.sync.push(body.get("ops", []))
+            elif self.path == '/pull':
+                response = self.server.sync.pull(body.get("vector", {}))
+            else:
+                self.send_error(404)
+                return
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_error(400, str(e))
+            return
+        data = json.dumps(response).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(path, host='127.0.0.1', port=8765):
+    sync = SyncServer(path)
+    server = ThreadingHTTPServer((host, port), SyncRequestHandler)
+    server.sync = sync
+    return server
+
+
+class SyncClient:
+    """Keeps a local task store in sync with a SyncServer.
+
+    Local changes are recorded as ops (through SyncedStorage) and kept in `pending`
+    until the server has them, so editing works offline. Network round trips happen
+    on a worker thread; their results are applied to the store by poll(), which the
+    GUI calls from the Tk thread. The replica, vector and pending ops are saved to
+    `state_path`, next to the task file, at most once per round; local changes made
+    since the last save are recorded again by reconcile() after a crash.
+    """
+
+    def __init__(self, url, state_path, interval=SYNC_INTERVAL):
+        self.url = url.rstrip('/')
+        self.state_path = state_path
+        self.interval = interval
+        self.store = None
+        self.muted = False      # applying remote changes; don't record them as local ops
+        self.online = None
+        self.dirty = False
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.in_flight = False
+        self.next_round = 0.0
+        self.worker = None
+
+        state = {}
+        if os.path.exists(state_path):
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        self.client_id = state.get("client") or uuid.uuid4().hex
+        self.counter = state.get("counter", 0)
+        self.pending = state.get("pending", [])
+        self.bootstrapped = state.get("bootstrapped", False)
+        self.replica = Replica({task_id: tuple(entry) for task_id, entry in state.get("tasks", {}).items()},
+                               state.get("vector", {}))
+
+    def save(self):
+        state = {
+            "client": self.client_id,
+            "counter": self.counter,
+            "bootstrapped": self.bootstrapped,
+            "vector": self.replica.vector,
+            "tasks": self.replica.tasks,
+            "pending": self.pending,
+        }
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.state_path)
+        self.dirty = False
+
+    def record(self, old_text, new_text):
+        # A local change: old_text None adds a task, new_text None deletes one
+        if self.muted or old_text == new_text:
+            return
+        task_id = self.replica.id_for(old_text) if old_text is not None else None
+        if task_id is None:
+            if new_text is None:
+                return      # deleting something the server never had
+            task_id = uuid.uuid4().hex
+        self.counter += 1
+        self.replica.clock += 1
+        op = {"origin": self.client_id, "counter": self.counter, "clock": self.replica.clock,
+              "id": task_id, "text": new_text}
+        self.replica.receive(op)
+        self.pending.append(op)
+        self.dirty = True
+
+    def forget(self, text):
+        # Drop a task from the replica without an op, e.g. once it has been archived here:
+        # other planners keep it, and reconcile() won't take it missing from the store for
+        # a deletion. A later change to it from elsewhere brings it back.
+        task_id = self.replica.id_for(text)
+        if task_id is None:
+            return
+        clock, origin, _ = self.replica.tasks[task_id]
+        self.replica.set(task_id, clock, origin, None)
+        self.dirty = True
+
+    def reconcile(self):
+        # Record whatever changed in the store outside of SyncedStorage (e.g. while sync was
+        # off) as ops: texts only the replica has are deleted, texts only the store has added
+        local, synced = Counter(task.text for task in self.store), Counter(self.replica.texts())
+        for text, count in (synced - local).items():
+            for _ in range(count):
+                self.record(text, None)
+        for text, count in (local - synced).items():
+            for _ in range(count):
+                self.record(None, text)
+
+    def round_trip(self, pending, vector):
+        # Push then pull; runs on the worker thread (or directly for sync_now)
+        acked = pending[-1]["counter"] if pending else 0
+        if pending:
+            self.post('/push', {"ops": pending})
+        return acked, self.post('/pull', {"vector": vector})["ops"]
+
+    def post(self, path, body):
+        request = urllib.request.Request(self.url + path, data=json.dumps(body).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=SYNC_TIMEOUT) as response:
+            return json.load(response)
+
+    def run_worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            try:
+                self.results.put(self.round_trip(*job))
+            except (OSError, ValueError) as e:
+                self.results.put(e)
+
+    def start(self, store):
+        self.store = store
+        if self.bootstrapped:
+            self.reconcile()
+        self.worker = threading.Thread(target=self.run_worker, daemon=True)
+        self.worker.start()
+
+    def request_round(self):
+        if self.dirty:
+            # Local changes are saved once per round rather than per edit, and before their
+            # ops are sent, so a restart never numbers new ops with counters already sent
+            self.save()
+        self.in_flight = True
+        self.next_round = time.monotonic() + self.interval
+        self.jobs.put((list(self.pending), dict(self.replica.vector)))
+
+    def poll(self):
+        # Tk thread: apply finished rounds, start the next one when due. Returns the
+        # (removed task, added task) pairs made to the store; either can be None.
+        changes = []
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.in_flight = False
+            if isinstance(result, Exception):
+                if self.online is not False:
+                    print(f"Sync server unreachable, working offline: {result}")
+                self.online = False
+                continue
+            self.online = True
+            changes.extend(self.merge(*result))
+            if self.dirty:
+                # Ops received or acknowledged; saved now so they aren't taken for local
+                # changes (and sent again as new tasks) after a restart
+                self.save()
+        if not self.in_flight and time.monotonic() >= self.next_round:
+            self.request_round()
+        return changes
+
+    def sync_now(self, store):
+        # One blocking round, for the command line
+        self.store = store
+        if self.bootstrapped:
+            self.reconcile()
+        changes = self.merge(*self.round_trip(list(self.pending), dict(self.replica.vector)))
+        if self.pending:
+            # Local tasks adopted during the first sync still need pushing
+            self.merge(*self.round_trip(list(self.pending), dict(self.replica.vector)))
+        self.save()
+        return changes
+
+    def merge(self, acked, ops):
+        # The state only needs saving if this round changed it: ops acknowledged or received
+        pending = [op for op in self.pending if op["counter"] > acked]
+        if len(pending) != len(self.pending):
+            self.pending = pending
+            self.dirty = True
+
+        # The first time, tasks the store already has are matched to identical server tasks
+        # instead of being duplicated
+        unbound = Counter(task.text for task in self.store) if not self.bootstrapped else Counter()
+        by_text = {}
+        if ops:
+            for task in self.store:
+                by_text.setdefault(task.text, []).append(task)
+
+        changes = []
+        with self.muting():
+            for op in ops:
+                accepted, change = self.replica.receive(op)
+                if accepted:
+                    self.dirty = True
+                if not change:
+                    continue
+                old_text, new_text = change
+                if old_text is None and unbound[new_text] > 0:
+                    unbound[new_text] -= 1
+                    continue
+                changes.append(self.apply(by_text, old_text, new_text))
+
+        if not self.bootstrapped:
+            self.bootstrapped = True
+            self.dirty = True
+            self.reconcile()
+        return changes
+
+    def apply(self, by_text, old_text, new_text):
+        old = by_text[old_text].pop() if old_text is not None and by_text.get(old_text) else None
+        if old is not None:
+            self.store.remove(old)
+        new = None
+        if new_text is not None:
+            new = Task.parse(new_text)
+            self.store.add(new)
+            by_text.setdefault(new_text, []).append(new)
+        return old, new
+
+    @contextmanager
+    def muting(self):
+        self.muted = True
+        try:
+            yield
+        finally:
+            self.muted = False
+
+    def close(self):
+        if self.worker:
+            self.jobs.put(None)
+        self.save()
+
+
+class SyncedStorage:
+    """Storage wrapper that also hands every change to a SyncClient as an op."""
+
+    def __init__(self, storage, client):
+        self.storage = storage
+        self.client = client
+
+    def add(self, text):
+        self.storage.add(text)
+        self.client.record(None, text)
+
+    def remove(self, text):
+        self.storage.remove(text)
+        self.client.record(text, None)
+
+    def update(self, old_text, new_text):
+        self.storage.update(old_text, new_text)
+        self.client.record(old_text, new_text)
+
+    def add_many(self, texts):
+        texts = list(texts)
+        self.storage.add_many(texts)
+        for text in texts:
+            self.client.record(None, text)
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+
+def sync_state_path(path):
+    return os.path.splitext(path)[0] + '.sync.json'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared planner sync server.")
+    parser.add_argument('--file', default='shared.json', help="merged task file (default: shared.json)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    server = serve(args.file, args.host, args.port)
+    print(f"Serving {args.file} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.sync.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+from datetime import date, datetime
+
+from analytics import Clash, clashes, overdue
+from planner_core import Task, TaskStore
+
+
+def test_clash_counts_unknown_priorities_as_other():
+    at = datetime(2024, 5, 10, 16, 0)
+    clash = Clash([(at, Task("10/05/24", "a", "High", "", "16:00")),
+                   (at, Task("10/05/24", "b", "High", "", "16:00")),
+                   (at, Task("10/05/24", "c", "Urgent", "", "16:00"))])
+    assert clash.describe() == "3 tasks at 16:00 (2 High, 1 other)"
+
+
+def test_clash_of_unknown_priorities():
+    at = datetime(2024, 5, 10, 16, 0)
+    clash = Clash([(at, Task("10/05/24", "a", "Urgent", "", "16:00")),
+                   (at, Task("10/05/24", "b", "Someday", "", "16:00"))])
+    assert clash.describe() == "2 tasks at 16:00 (2 other)"
+
+
+def test_clashes_group_same_slot():
+    store = TaskStore([Task("10/05/24", "a", "High", "", "16:00"), Task("10/05/24", "b", "Low", "", "16:00"),
+                       Task("10/05/24", "c", "Low", "", "17:00")])
+    [clash] = clashes(store, date(2024, 5, 10), date(2024, 5, 10))
+    assert clash.describe() == "2 tasks at 16:00 (1 High, 1 Low)"
+
+
+def test_overdue_sorts_by_deadline():
+    store = TaskStore([Task("10/05/24", "late", "Medium", "", "16:00"), Task("10/05/24", "early", "Medium", "", "9:00"),
+                       Task("10/05/24", "untimed"), Task("09/05/24", "before")])
+    late = overdue(store, now=datetime(2024, 5, 11, 8, 0))
+    assert [task.title for task in late] == ["before", "early", "late", "untimed"]
@@ -0,0 +1,53 @@
+from datetime import date
+
+import archive as archive_module
+from archive import Archive, archive_completed
+from planner_core import Task, TaskStore
+from sync import SyncClient
+
+
+def done(date_str, title):
+    return Task(date_str, title, status="Done")
+
+
+def test_old_completed_tasks_are_archived(tmp_path):
+    store = TaskStore([done("01/03/24", "old"), Task("02/03/24", "open"), done("20/05/24", "recent"),
+                       done("15/04/24", "april")])
+    archive = Archive(str(tmp_path / "archive"))
+    moved = archive_completed(store, archive, 30, today=date(2024, 6, 1))
+    assert sorted(task.title for task in moved) == ["april", "old"]
+    assert sorted(task.title for task in store) == ["open", "recent"]
+    assert archive.months() == [(2024, 3), (2024, 4)]
+
+    # Read back from the files, and not duplicated by archiving the same tasks again
+    again = Archive(str(tmp_path / "archive"))
+    again.add(moved)
+    assert [task.title for task in again.month(2024, 3)] == ["old"]
+    assert [task.title for task in again.month(2024, 4)] == ["april"]
+    assert [task.title for task in again.search("apr")] == ["april"]
+
+
+def test_archived_tasks_are_not_deleted_elsewhere(tmp_path):
+    # Archiving takes a synced task out of the store without recording a deletion
+    client = SyncClient("http://127.0.0.1:9", str(tmp_path / "tasks.sync.json"))
+    task = done("01/03/24", "old")
+    client.store = store = TaskStore([task])
+    client.record(None, task.text)
+    client.bootstrapped, client.pending = True, []
+    archive_completed(store, Archive(str(tmp_path / "archive")), 30, today=date(2024, 6, 1))
+    client.forget(task.text)
+    client.reconcile()
+    assert client.pending == [] and client.replica.texts() == []
+
+
+def test_search_reads_once_and_indexes(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive_module, "INDEX_MIN_TASKS", 2)
+    archive = Archive(str(tmp_path / "archive"))
+    archive.add([done("01/03/24", "march review"), done("01/04/24", "april review"), done("02/04/24", "retro")])
+    reads = []
+    again = Archive(str(tmp_path / "archive"))
+    monkeypatch.setattr(again, "read", lambda year, month: reads.append(month) or archive.read(year, month))
+    assert [task.title for task in again.search("review")] == ["march review", "april review"]
+    assert [task.title for task in again.search("retro")] == ["retro"]
+    assert sorted(reads) == [3, 4]
+    assert again.store().text_index.ready()
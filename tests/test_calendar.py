@@ -0,0 +1,25 @@
+import pytest
+
+from planner_core import month_window
+
+
+def test_month_window_takes_month_then_year():
+    assert month_window((10, 2026), 1) == [(2026, 9), (2026, 10), (2026, 11)]
+    assert month_window((1, 2027), 1) == [(2026, 12), (2027, 1), (2027, 2)]
+    assert month_window((12, 2026), 0) == [(2026, 12)]
+
+
+def test_calendar_gives_month_then_year():
+    # month_window relies on tkcalendar's order; needs tkcalendar and a display
+    tkcalendar = pytest.importorskip("tkcalendar")
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    try:
+        calendar = tkcalendar.Calendar(root, year=2026, month=10, day=18)
+        assert calendar.get_displayed_month() == (10, 2026)
+        assert month_window(calendar.get_displayed_month(), 1)[1] == (2026, 10)
+    finally:
+        root.destroy()
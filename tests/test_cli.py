@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from planner_cli import main
+
+
+@pytest.fixture
+def planner(tmp_path, monkeypatch):
+    for name in ("PLANNER_STORAGE", "PLANNER_SYNC", "PLANNER_PROFILE"):
+        monkeypatch.delenv(name, raising=False)
+    path = str(tmp_path / "tasks.json")
+    return lambda *argv: main(["--file", path, *argv])
+
+
+def test_add_list_complete(planner, capsys):
+    assert planner("add", "10/05/24", "Review", "-p", "High", "-t", "16:00") == 0
+    assert planner("add", "09/05/24", "Standup") == 0
+    capsys.readouterr()
+    assert planner("list", "--sort", "date") == 0
+    assert capsys.readouterr().out.splitlines() == ["2. 09/05/24 - Standup [Medium]:  (12:00)",
+                                                   "1. 10/05/24 - Review [High]:  (16:00)"]
+    assert planner("complete", "1") == 0
+    capsys.readouterr()
+    assert planner("list", "status:Done") == 0
+    assert capsys.readouterr().out.splitlines() == ["1. 10/05/24 - Review [Done]:  (16:00)"]
+
+
+def test_import_export(planner, tmp_path, capsys):
+    source = tmp_path / "in.csv"
+    source.write_text("date,title,time\n2024-05-10,Review,16:00\n2024-05-10,Review,16:00\nbad,row,\n")
+    assert planner("import", str(source)) == 1
+    assert "Imported 1 task(s), 1 already there, 1 problem(s)" in capsys.readouterr().out
+    assert planner("export", "--format", "json") == 0
+    [text] = json.loads(capsys.readouterr().out)
+    assert text.startswith("10/05/24 - Review [Medium]:  (16:00)")
+
+
+def test_add_rejects_invalid_times(planner, capsys):
+    for time in ("25:00", "12:75", "9"):
+        assert planner("add", "10/05/24", "Review", "-t", time) == 1
+        assert f"Invalid time: {time}" in capsys.readouterr().err
+    assert planner("list") == 0
+    assert capsys.readouterr().out == ""
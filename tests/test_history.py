@@ -0,0 +1,53 @@
+from history import History
+from planner_core import Task, TaskStore
+
+
+class Recorder:
+    """Storage that only remembers the changes handed to it."""
+
+    def __init__(self):
+        self.changes = []
+
+    def add(self, text):
+        self.changes.append((None, text))
+
+    def remove(self, text):
+        self.changes.append((text, None))
+
+    def update(self, old, new):
+        self.changes.append((old, new))
+
+    def add_many(self, texts):
+        self.changes.extend((None, text) for text in texts)
+
+
+def test_undo_and_redo():
+    recorder = Recorder()
+    history = History(recorder)
+    store = TaskStore([Task("10/05/24", "a")], storage=history)
+    task = next(iter(store))
+    store.update(task, title="b")
+    store.add(Task("11/05/24", "c"))
+    assert [t.title for t in store] == ["b", "c"]
+
+    history.undo(store, 2)
+    assert [t.title for t in store] == ["a"]
+    assert next(iter(store)) is task
+    history.redo(store)
+    assert [t.title for t in store] == ["b"]
+    # Undone changes reach storage like any other
+    assert recorder.changes[-1][1] == task.text
+    # A new change drops what's left to redo
+    store.remove(task)
+    assert not history.can_redo()
+    history.undo(store)
+    assert [t.title for t in store] == ["b"]
+
+
+def test_history_limit():
+    history = History(Recorder(), limit_kb=1)
+    store = TaskStore(storage=history)
+    for n in range(100):
+        store.add(Task("10/05/24", f"task {n}"))
+    assert 0 < len(history.undo_steps) < 100
+    assert history.size <= 1024
@@ -0,0 +1,65 @@
+from interchange import read_csv, read_ics, write_csv, write_ics
+from planner_core import Task
+
+
+def ics(*properties):
+    return ["BEGIN:VCALENDAR", "BEGIN:VEVENT", *properties, "END:VEVENT", "END:VCALENDAR"]
+
+
+def reread(task):
+    # The task as read back from its own text
+    return Task.parse(task.text)
+
+
+def test_bracketed_summary_keeps_its_priority():
+    errors = []
+    [task] = read_ics(ics("UID:a@example.com", "DTSTART;VALUE=DATE:20240510",
+                          "SUMMARY:Sprint review [team]: planning", "PRIORITY:1"), errors)
+    assert errors == []
+    again = reread(task)
+    assert (again.title, again.priority) == ("Sprint review (team): planning", "High")
+
+
+def test_description_does_not_become_fields():
+    errors = []
+    [task] = read_ics(ics("UID:b@example.com", "DTSTART;VALUE=DATE:20240510", "SUMMARY:Call",
+                          "DESCRIPTION:ask about {remind 5m}\\nthen (16:00) ✓"), errors)
+    again = reread(task)
+    assert again.time is None and again.reminder is None and again.status == "Open"
+    assert again.description == task.description
+    assert "\n" not in task.text
+
+
+def test_invalid_priority_is_a_warning():
+    errors = []
+    [task] = read_ics(ics("UID:c@example.com", "DTSTART;VALUE=DATE:20240510", "SUMMARY:Call",
+                          "PRIORITY:HIGH"), errors)
+    assert task.priority == "Medium"
+    assert len(errors) == 1 and "invalid priority" in errors[0]
+
+
+def test_ics_round_trip():
+    task = Task("10/05/24", "Sprint review (team): planning", "High", "notes", "09:30", "Open",
+                reminder=15, task_id="0123456789ab")
+    [again] = read_ics("".join(write_ics([task])).splitlines(), [])
+    assert again.text == task.text
+
+
+def test_csv_round_trip():
+    task = Task("10/05/24", "Standup", "Low", "room 2", None, "Done", task_id="0123456789ab")
+    [again] = read_csv("".join(write_csv([task])).splitlines(), [])
+    assert again.text == task.text
+
+
+def test_csv_title_brackets():
+    rows = ["date,title,priority,description", '2024-05-10,"Sprint review [team]: planning",high,"a\nb {x}"']
+    [task] = read_csv("\n".join(rows).splitlines(True), [])
+    again = reread(task)
+    assert (again.title, again.priority, again.description) == ("Sprint review (team): planning", "High", "a b (x)")
+
+
+def test_csv_rejects_invalid_times():
+    errors = []
+    rows = ["date,title,time", "2024-05-10,Late,25:00", "2024-05-10,Odd,12:75", "2024-05-10,Fine,9:05"]
+    assert [task.time for task in read_csv(rows, errors)] == ["9:05"]
+    assert len(errors) == 2 and all("invalid time" in error for error in errors)
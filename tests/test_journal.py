@@ -0,0 +1,76 @@
+import json
+
+from planner_core import Task
+from storage import JournalStorage
+
+
+def texts(*titles):
+    return [Task("10/05/24", title, task_id=f"{n:012x}").text for n, title in enumerate(titles, 1)]
+
+
+def reopen(path, **kwargs):
+    storage = JournalStorage(str(path), **kwargs)
+    try:
+        return storage.load()
+    finally:
+        storage.close()
+
+
+def journaled(path, **kwargs):
+    # A task file with a snapshot of a and b, then b updated and c added in its journal
+    a, b, b2, c = texts("a", "b", "b2", "c")
+    storage = JournalStorage(str(path), **kwargs)
+    storage.compact([a, b])
+    storage.update(b, b2)
+    storage.add(c)
+    storage.close()
+    return [a, b2, c]
+
+
+def test_journal_replayed_on_load(tmp_path):
+    a, b, c = texts("a", "b", "c")
+    storage = JournalStorage(str(tmp_path / "tasks.json"))
+    storage.add(a)
+    storage.add(b)
+    storage.update(a, c)
+    storage.remove(b)
+    storage.close()
+    assert not (tmp_path / "tasks.json").exists()
+    assert reopen(tmp_path / "tasks.json") == [c]
+
+
+def test_compact_folds_the_journal(tmp_path):
+    path = tmp_path / "tasks.json"
+    expected = journaled(path)
+    storage = JournalStorage(str(path))
+    storage.compact(storage.load())
+    storage.close()
+    assert json.loads(path.read_text()) == expected
+    assert len((tmp_path / "tasks.journal").read_text().splitlines()) == 1
+    assert reopen(path) == expected
+
+
+def test_stale_journal_is_dropped(tmp_path):
+    path = tmp_path / "tasks.json"
+    journaled(path)
+    # The snapshot replaced without its journal, as after a crash mid-compaction
+    a, = texts("a")
+    path.write_text(json.dumps([a]))
+    assert reopen(path) == [a]
+    assert not (tmp_path / "tasks.journal").exists()
+
+
+def test_truncated_entry_is_skipped(tmp_path):
+    path = tmp_path / "tasks.json"
+    expected = journaled(path)
+    with open(tmp_path / "tasks.journal", "a") as f:
+        f.write('{"op": "add", "te')
+    assert reopen(path) == expected
+
+
+def test_coalesce():
+    a, b, c = texts("a", "b", "c")
+    entries = [{"op": "add", "text": a}, {"op": "update", "old": a, "new": b},
+               {"op": "update", "old": c, "new": a}, {"op": "remove", "text": a},
+               {"op": "add", "text": c}, {"op": "remove", "text": c}]
+    assert JournalStorage.coalesce(entries) == [{"op": "add", "text": b}, {"op": "remove", "text": c}]
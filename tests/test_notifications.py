@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from planner_core import NotificationScheduler, Recurrence, Task
+
+
+def test_due_and_reminder_in_order():
+    scheduler = NotificationScheduler()
+    now = datetime(2024, 5, 10, 8, 0)
+    review = Task("10/05/24", "Review", time="16:00", reminder=30)
+    standup = Task("10/05/24", "Standup", time="09:00")
+    for task in (review, standup):
+        scheduler.schedule(task, now)
+    assert scheduler.next_time() == datetime(2024, 5, 10, 9, 0)
+    due = scheduler.pop_due(datetime(2024, 5, 10, 16, 0))
+    assert [(when.strftime("%H:%M"), kind, task.title) for when, kind, task in due] == \
+        [("09:00", "due", "Standup"), ("15:30", "reminder", "Review"), ("16:00", "due", "Review")]
+
+
+def test_rescheduling_replaces_entries():
+    scheduler = NotificationScheduler()
+    now = datetime(2024, 5, 10, 8, 0)
+    task = Task("10/05/24", "Review", time="16:00")
+    scheduler.schedule(task, now)
+    task.update(time="17:00")
+    scheduler.schedule(task, now)
+    assert scheduler.next_time() == datetime(2024, 5, 10, 17, 0)
+    scheduler.unschedule(task)
+    assert scheduler.next_time() is None
+
+
+def test_invalid_times_are_skipped():
+    scheduler = NotificationScheduler()
+    now = datetime(2024, 5, 10, 8, 0)
+    for text in ("10/05/24 - Late [High]:  (25:00)",
+                 "10/05/24 - Weekly [High]:  (12:75) {rrule FREQ=WEEKLY}"):
+        scheduler.schedule(Task.parse(text), now)
+    scheduler.schedule(Task("10/05/24", "Odd", time="25:00", recurrence=Recurrence("FREQ=DAILY")), now)
+    assert scheduler.next_time() is None
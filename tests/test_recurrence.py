@@ -0,0 +1,40 @@
+from datetime import date
+
+import pytest
+
+from planner_core import Occurrence, Recurrence, Task, TaskStore
+
+
+def dates(rule, start, first, last):
+    return list(Recurrence(rule).between(start, first, last))
+
+
+def test_daily_and_weekly_recurrence():
+    start = date(2024, 5, 6)    # a Monday
+    assert dates("FREQ=DAILY;INTERVAL=2;COUNT=3", start, start, date(2024, 6, 1)) == \
+        [date(2024, 5, 6), date(2024, 5, 8), date(2024, 5, 10)]
+    assert dates("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH", start, date(2024, 5, 13), date(2024, 5, 31)) == \
+        [date(2024, 5, 20), date(2024, 5, 23)]
+
+
+def test_monthly_recurrence_skips_short_months():
+    start = date(2024, 1, 31)
+    assert dates("FREQ=MONTHLY;UNTIL=20240601", start, start, date(2024, 12, 31)) == \
+        [date(2024, 1, 31), date(2024, 3, 31), date(2024, 5, 31)]
+
+
+def test_invalid_recurrence():
+    with pytest.raises(ValueError):
+        Recurrence("FREQ=HOURLY")
+    with pytest.raises(ValueError):
+        Recurrence("FREQ=DAILY;BYHOUR=9")
+
+
+def test_recurring_tasks_expand_within_the_range():
+    store = TaskStore([Task("06/05/24", "standup", recurrence=Recurrence("FREQ=DAILY"))])
+    store.complete(store.get(next(iter(store)).id), date(2024, 5, 7))
+    found = store.between(date(2024, 5, 7), date(2024, 5, 9))
+    assert all(isinstance(task, Occurrence) for task in found)
+    assert [task.date for task in found] == [date(2024, 5, 7), date(2024, 5, 8), date(2024, 5, 9)]
+    assert [task.date for task in store.between(date(2024, 5, 7), date(2024, 5, 9), open_only=True)] == \
+        [date(2024, 5, 8), date(2024, 5, 9)]
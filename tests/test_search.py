@@ -0,0 +1,16 @@
+from planner_core import Task, TaskStore
+
+
+def test_index_finds_what_the_scan_finds():
+    tasks = [Task("10/05/24", f"{word} {n}", priority) for n, (word, priority) in
+             enumerate([("review", "High"), ("Preview", "Low"), ("standup", "High"), ("retro", "Medium")] * 5)]
+    scanned, indexed = TaskStore(tasks[:]), TaskStore([Task.parse(task.text) for task in tasks])
+    assert not indexed.text_index.build(limit=3)
+    # Searches keep scanning until the index is complete
+    assert [t.title for t in indexed.search("view")] == [t.title for t in scanned.search("view")]
+    indexed.text_index.build()
+    for store in (scanned, indexed):
+        store.remove(next(task for task in store if task.title == "review 0"))
+        store.update(next(task for task in store if task.title == "retro 3"), title="overview")
+    for query in ("view", "vie", "re", "review priority:High", "overview", "nothing"):
+        assert [t.title for t in indexed.search(query)] == [t.title for t in scanned.search(query)]
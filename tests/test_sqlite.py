@@ -0,0 +1,70 @@
+import os
+import sqlite3
+
+from planner_core import Task
+from storage import JournalStorage, SqliteStorage
+from test_journal import journaled, texts
+
+
+def test_sqlite_import_replays_the_journal(tmp_path):
+    expected = journaled(tmp_path / "tasks.json")
+    storage = SqliteStorage(str(tmp_path / "tasks.db"), Task.parse)
+    try:
+        assert storage.import_json(str(tmp_path / "tasks.json")) == 3
+        assert storage.load() == expected
+        # Only the first time
+        assert storage.import_json(str(tmp_path / "tasks.json")) == 0
+    finally:
+        storage.close()
+        storage.db.close()
+
+
+def test_sqlite_imports_a_journal_only_file(tmp_path):
+    a, = texts("a")
+    source = JournalStorage(str(tmp_path / "tasks.json"))
+    source.add(a)
+    source.close()
+    assert not os.path.exists(tmp_path / "tasks.json")
+    storage = SqliteStorage(str(tmp_path / "tasks.db"), Task.parse)
+    try:
+        assert storage.import_json(str(tmp_path / "tasks.json")) == 1
+        assert storage.load() == [a]
+    finally:
+        storage.close()
+        storage.db.close()
+
+
+def test_sqlite_changes(tmp_path):
+    a, b, c = texts("a", "b", "c")
+    storage = SqliteStorage(str(tmp_path / "tasks.db"), Task.parse)
+    storage.add_many([a, b])
+    storage.update(a, c)
+    storage.remove(b)
+    storage.close()
+    storage.db.close()
+    storage = SqliteStorage(str(tmp_path / "tasks.db"), Task.parse)
+    try:
+        assert storage.load() == [c]
+    finally:
+        storage.close()
+        storage.db.close()
+
+
+def test_indexes(tmp_path):
+    # Only the indexes queries use; databases made with the earlier ones lose them
+    path = str(tmp_path / "tasks.db")
+    db = sqlite3.connect(path)
+    db.executescript("CREATE TABLE tasks (id INTEGER PRIMARY KEY, position INTEGER NOT NULL, day INTEGER, "
+                     "time TEXT, title TEXT, priority TEXT, status TEXT, description TEXT, text TEXT NOT NULL);"
+                     "CREATE INDEX tasks_day ON tasks (day); CREATE INDEX tasks_status ON tasks (status);")
+    db.close()
+    storage = SqliteStorage(path, Task.parse)
+    try:
+        indexes = {name for (name,) in storage.db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tasks'")}
+        assert indexes == {"tasks_position", "tasks_text"}
+        plan = storage.db.execute("EXPLAIN QUERY PLAN SELECT MAX(position) FROM tasks").fetchall()
+        assert "tasks_position" in str(plan)
+    finally:
+        storage.close()
+        storage.db.close()
@@ -0,0 +1,14 @@
+from datetime import date
+
+from planner_core import SortOrder, Task, TaskStore
+
+
+def test_store_order_and_date_index():
+    store = TaskStore([Task("12/05/24", "c"), Task("10/05/24", "b", time="16:00"), Task("10/05/24", "a", time="9:00")],
+                      order=SortOrder("date, time"))
+    assert [task.title for task in store] == ["a", "b", "c"]
+    store.add(Task("11/05/24", "d"))
+    assert [task.title for task in store] == ["a", "b", "d", "c"]
+    store.update(store.get(next(iter(store)).id), date_str="13/05/24")
+    assert [task.title for task in store] == ["b", "d", "c", "a"]
+    assert [task.title for task in store.between(date(2024, 5, 11), date(2024, 5, 12))] == ["d", "c"]
@@ -0,0 +1,155 @@
+import json
+import threading
+
+import pytest
+
+from planner_core import Task, TaskStore
+from storage import JournalStorage
+from sync import Replica, SyncClient, SyncedStorage, serve
+
+
+def op(origin, counter, clock, task_id, text):
+    return {"origin": origin, "counter": counter, "clock": clock, "id": task_id, "text": text}
+
+
+def test_replica_last_writer_wins():
+    replica = Replica()
+    assert replica.receive(op("a", 1, 1, "t", "one")) == (True, (None, "one"))
+    assert replica.receive(op("b", 1, 3, "t", "three")) == (True, ("one", "three"))
+    # Older, arriving late: seen but loses
+    assert replica.receive(op("a", 2, 2, "t", "two")) == (True, None)
+    # Already seen
+    assert replica.receive(op("a", 2, 2, "t", "two")) == (False, None)
+    assert replica.texts() == ["three"]
+    assert replica.vector == {"a": 2, "b": 1}
+
+
+def test_replica_ties_and_deletes():
+    replica = Replica()
+    replica.receive(op("a", 1, 5, "t", "from a"))
+    replica.receive(op("b", 1, 5, "t", "from b"))
+    assert replica.texts() == ["from b"]
+    replica.receive(op("a", 2, 6, "t", None))
+    # A deleted task stays deleted against older ops
+    replica.receive(op("c", 1, 4, "t", "from c"))
+    assert replica.texts() == []
+    assert replica.id_for("from b") is None
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = serve(str(tmp_path / "shared.json"), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    server.sync.close()
+
+
+class Planner:
+    """A planner's task file, store and sync client, as the command line sets them up."""
+
+    def __init__(self, directory, url):
+        directory.mkdir(exist_ok=True)
+        self.storage = JournalStorage(str(directory / "tasks.json"))
+        self.client = SyncClient(url, str(directory / "tasks.sync.json"))
+        self.store = TaskStore(Task.parse(text) for text in self.storage.load())
+        self.store.storage = SyncedStorage(self.storage, self.client)
+
+    def sync(self):
+        return self.client.sync_now(self.store)
+
+    def titles(self):
+        return sorted(task.title for task in self.store)
+
+    def find(self, title):
+        return next(task for task in self.store if task.title == title)
+
+    def close(self):
+        self.client.close()
+        self.storage.close()
+
+
+@pytest.fixture
+def planners(tmp_path, server):
+    planners = [Planner(tmp_path / name, server) for name in ("a", "b")]
+    yield planners
+    for planner in planners:
+        planner.close()
+
+
+def test_changes_reach_the_other_planner(planners):
+    a, b = planners
+    a.store.add(Task("10/05/24", "Standup"))
+    a.store.add(Task("11/05/24", "Review"))
+    a.sync()
+    b.sync()
+    assert b.titles() == ["Review", "Standup"]
+
+    b.store.update(b.find("Standup"), title="Daily standup")
+    b.store.remove(b.find("Review"))
+    b.sync()
+    a.sync()
+    assert a.titles() == ["Daily standup"]
+
+
+def test_concurrent_edits_converge(planners):
+    a, b = planners
+    a.store.add(Task("10/05/24", "Standup"))
+    a.sync()
+    b.sync()
+    a.store.update(a.find("Standup"), priority="High")
+    b.store.update(b.find("Standup"), priority="Low")
+    a.sync()
+    b.sync()
+    a.sync()
+    assert [task.text for task in a.store] == [task.text for task in b.store]
+
+
+def test_existing_tasks_are_not_duplicated(tmp_path, server):
+    # Both planners already have the same task before they first sync
+    text = Task("10/05/24", "Standup", task_id="0123456789ab").text
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        storage = JournalStorage(str(tmp_path / name / "tasks.json"))
+        storage.add(text)
+        storage.close()
+    planners = [Planner(tmp_path / name, server) for name in ("a", "b")]
+    try:
+        for planner in planners + planners:
+            planner.sync()
+        assert [planner.titles() for planner in planners] == [["Standup"], ["Standup"]]
+    finally:
+        for planner in planners:
+            planner.close()
+
+
+def test_idle_round_leaves_state_clean(planners):
+    a, _ = planners
+    a.sync()
+    a.client.merge(0, [])
+    assert not a.client.dirty
+
+
+def test_poll_saves_once_per_round(tmp_path):
+    # No worker: rounds are queued but only finish when a result is put in
+    path = tmp_path / "tasks.sync.json"
+    client = SyncClient("http://127.0.0.1:9", str(path), interval=3600)
+    client.store, client.bootstrapped = TaskStore(), True
+
+    def saved_pending():
+        return len(json.loads(path.read_text())["pending"])
+
+    for title in ("a", "b"):
+        client.record(None, Task("10/05/24", title).text)
+    client.poll()
+    # Saved before the round's ops were sent
+    assert saved_pending() == 2 and client.jobs.qsize() == 1
+    client.record(None, Task("10/05/24", "c").text)
+    client.poll()
+    assert saved_pending() == 2 and client.dirty
+    # The round's ops acknowledged
+    client.results.put((2, []))
+    client.poll()
+    assert saved_pending() == 1 and not client.dirty
@@ -0,0 +1,23 @@
+from datetime import date
+
+from planner_core import Recurrence, Task
+
+
+def test_task_text_round_trip():
+    task = Task("10/05/24", "Review", "High", "notes", "09:30", reminder=15,
+                recurrence=Recurrence("FREQ=WEEKLY"), done_dates=frozenset([date(2024, 5, 17)]),
+                task_id="0123456789ab")
+    again = Task.parse(task.text)
+    assert again.text == task.text
+    assert (again.title, again.priority, again.time, again.reminder) == ("Review", "High", "09:30", 15)
+    assert again.display == "10/05/24 - Review [High]: notes (09:30)"
+
+
+def test_invalid_time_is_not_a_deadline():
+    text = "18/10/26 - Late [High]: notes (25:00) {id 0123456789ab}"
+    task = Task.parse(text)
+    assert task.time is None and task.deadline is None
+    assert task.description == "notes (25:00)"
+    task.update(title="Later")
+    assert task.text == "18/10/26 - Later [High]: notes (25:00) {id 0123456789ab}"
+    assert Task("18/10/26", "Odd", time="12:75").deadline is None